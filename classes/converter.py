@@ -315,6 +315,7 @@ def convert(logfile_as_string: str) -> list[Log]:
             key, delay = clean_keystrokes[i]
             if delay is not None:
                 log['keystrokes'][i].time = round(delay, ROUND_DIGITS)
+        log['keystrokes'].invalidate()
         print('recorded keys:', len(clean_keystrokes),
               'logged keys:', len(log['keystrokes']))
 
@@ -0,0 +1,288 @@
+# KeyMaster imports
+from classes.key_arrays import KeyArrays
+from utils.constants import SPECIAL_KEY_DISPLAY_NAMES
+from utils.settings import BURST_PAUSE, FEATURE_CACHE_SUFFIX
+
+# Standard library imports
+from hashlib import blake2b
+from os import path, replace
+import logging
+logging.basicConfig(encoding='utf-8', level=logging.INFO)
+
+# Third party imports
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+# Bump when the extraction changes to discard old matrices
+FEATURE_CACHE_VERSION = 1
+
+# The most frequent English letter pairs and letters
+DEFAULT_FEATURE_DIGRAPHS = ("th", "he", "in", "er", "an", "re", "on", "at",
+                            "en", "nd", "ti", "es", "or", "te", "of")
+DEFAULT_FEATURE_KEYS = ("e", "t", "a", "o", "i", "n", "s", "h", "r",
+                        "'space'", "'backspace'")
+DEFAULT_FEATURE_PERCENTILES = (10, 25, 50, 75, 90)
+BACKSPACE_KEY = "'backspace'"
+
+
+def get_feature_cache_path(filepath: str | None) -> str | None:
+    """
+    The feature matrix is stored next to its logfile.
+    """
+    if filepath is None:
+        return None
+    return filepath + FEATURE_CACHE_SUFFIX
+
+
+def display_key(key: str) -> str:
+    """
+    The name KeyArrays uses for a legal key.
+    """
+    return SPECIAL_KEY_DISPLAY_NAMES.get(key, key)
+
+
+class FeatureSchema:
+    """
+    The features extracted for every log, in column order:
+    mean_delay, std_delay, wpm, a column per percentile, per key and per digraph,
+    then burst_count, mean_burst_length, pause_fraction, backspace_rate and
+    backspace_burst_rate. Pass empty tuples to drop a group.
+
+    Attributes:
+    ----------
+    - digraphs (`tuple[tuple[str, str], ...]`): Legal key pairs. Two-char strings like "th" are accepted.
+    - keys (`tuple[str, ...]`): Legal keys whose mean delay is a feature.
+    - percentiles (`tuple[float, ...]`): Delay percentiles, 0-100.
+    - burst_pause (`float`): A longer delay ends a typing burst, as in iter_segments.
+    - exclude_outliers (`bool`): Whether delays above OUTLIER_CUTOFF are left out of delay features.
+    """
+
+    def __init__(self,
+                 digraphs=DEFAULT_FEATURE_DIGRAPHS,
+                 keys=DEFAULT_FEATURE_KEYS,
+                 percentiles=DEFAULT_FEATURE_PERCENTILES,
+                 burst_pause: float = BURST_PAUSE,
+                 exclude_outliers: bool = True) -> None:
+        self.digraphs = tuple(tuple(digraph) for digraph in digraphs)
+        if any(len(digraph) != 2 for digraph in self.digraphs):
+            raise ValueError("A digraph must have exactly two keys.")
+        self.keys = tuple(keys)
+        self.percentiles = tuple(percentiles)
+        if any(not 0 <= q <= 100 for q in self.percentiles):
+            raise ValueError("Percentiles must be between 0 and 100.")
+        self.burst_pause = burst_pause
+        self.exclude_outliers = exclude_outliers
+
+    def names(self) -> list[str]:
+        return (["mean_delay", "std_delay", "wpm"] +
+                [f"p{q}" for q in self.percentiles] +
+                [f"key:{key}" for key in self.keys] +
+                [f"digraph:{first}{second}" for first, second in self.digraphs] +
+                ["burst_count", "mean_burst_length", "pause_fraction",
+                 "backspace_rate", "backspace_burst_rate"])
+
+    def signature(self) -> str:
+        """
+        Identifies the schema in a cached matrix.
+        """
+        return blake2b(repr((FEATURE_CACHE_VERSION, self.digraphs, self.keys,
+                             self.percentiles, self.burst_pause,
+                             self.exclude_outliers)).encode(),
+                       digest_size=16).hexdigest()
+
+    def __repr__(self) -> str:
+        return (f"FeatureSchema({len(self.names())} features, "
+                f"burst_pause={self.burst_pause}, exclude_outliers={self.exclude_outliers})")
+
+
+def per_log_means(log_of: 'np.ndarray', columns: 'np.ndarray', delays: 'np.ndarray',
+                  log_count: int, column_count: int) -> 'np.ndarray':
+    """
+    The mean delay of each (log, column). NaN where there is no delay.
+    Keystrokes with a negative column are ignored.
+    """
+    selected = columns >= 0
+    cells = log_of[selected] * column_count + columns[selected]
+    size = log_count * column_count
+    counts = np.bincount(cells, minlength=size)
+    sums = np.bincount(cells, weights=delays[selected], minlength=size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (sums / counts).reshape(log_count, column_count)
+
+
+def extract_features(arrays: KeyArrays, schema: FeatureSchema) -> 'np.ndarray':
+    """
+    Turn every log of a KeyArrays view into a feature row, with array operations only.
+
+    Args:
+        `arrays` (`KeyArrays`): The logs.
+        `schema` (`FeatureSchema`): The features to extract.
+
+    Returns:
+        `np.ndarray`: A float matrix of shape (logs, features). NaN where a feature is undefined.
+    """
+    log_count = len(arrays.ids)
+    sizes = np.diff(arrays.offsets)
+    log_of = np.repeat(np.arange(log_count), sizes)
+    delays = arrays.delays
+    codes = arrays.codes
+    usable = arrays.mask(schema.exclude_outliers)
+    # Code of the previous keystroke in the same log, -1 at the start of a log
+    previous_codes = np.empty_like(codes)
+    previous_codes[:1] = -1
+    previous_codes[1:] = codes[:-1]
+    previous_codes[arrays.offsets[:-1][sizes > 0]] = -1
+    # Unusable delays are zeroed here and skipped through the column masks
+    usable_delays = np.where(usable, delays, 0.0)
+    usable_log_of = log_of[usable]
+    columns: list['np.ndarray'] = []
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        counts = np.bincount(usable_log_of, minlength=log_count).astype(np.float64)
+        sums = np.bincount(usable_log_of, weights=delays[usable], minlength=log_count)
+        squares = np.bincount(usable_log_of, weights=delays[usable] ** 2, minlength=log_count)
+        means = sums / counts
+        variances = np.maximum(squares - sums * means, 0.0) / (counts - 1)
+        columns.append(means)
+        columns.append(np.where(counts >= 2, np.sqrt(variances), np.nan))
+        columns.append(np.where(sums > 0, counts / sums * 12, np.nan))
+
+        if schema.percentiles:
+            sorted_delays = delays[usable][np.lexsort((delays[usable], usable_log_of))]
+            int_counts = counts.astype(np.int64)
+            starts = np.cumsum(int_counts) - int_counts
+            last = max(len(sorted_delays) - 1, 0)
+            for q in schema.percentiles:
+                position = (int_counts - 1).clip(min=0) * (q / 100)
+                lower = np.floor(position).astype(np.int64)
+                upper = np.minimum(lower + 1, (int_counts - 1).clip(min=0))
+                if len(sorted_delays):
+                    low_values = sorted_delays[np.minimum(starts + lower, last)]
+                    high_values = sorted_delays[np.minimum(starts + upper, last)]
+                    values = low_values + (high_values - low_values) * (position - lower)
+                else:
+                    values = np.zeros(log_count)
+                columns.append(np.where(int_counts > 0, values, np.nan))
+
+        # Lookup tables from KeyArrays codes (shifted by one for -1) to feature columns
+        display_codes = {key: code for code, key in enumerate(arrays.keys)}
+        if schema.keys:
+            key_columns = np.full(len(arrays.keys) + 1, -1, dtype=np.int64)
+            for column, key in enumerate(schema.keys):
+                code = display_codes.get(display_key(key))
+                if code is not None:
+                    key_columns[code + 1] = column
+            selected = np.where(usable, key_columns[codes + 1], -1)
+            key_means = per_log_means(log_of, selected, usable_delays,
+                                      log_count, len(schema.keys))
+            columns.extend(key_means.T)
+        if schema.digraphs:
+            pair_columns = np.full((len(arrays.keys) + 1, len(arrays.keys) + 1), -1,
+                                   dtype=np.int64)
+            for column, (first, second) in enumerate(schema.digraphs):
+                first_code = display_codes.get(display_key(first))
+                second_code = display_codes.get(display_key(second))
+                if first_code is not None and second_code is not None:
+                    pair_columns[first_code + 1, second_code + 1] = column
+            selected = np.where(usable, pair_columns[previous_codes + 1, codes + 1], -1)
+            pair_means = per_log_means(log_of, selected, usable_delays,
+                                       log_count, len(schema.digraphs))
+            columns.extend(pair_means.T)
+
+        # Bursts use every delay, like iter_segments
+        timed = ~np.isnan(delays)
+        pauses = delays > schema.burst_pause
+        pause_counts = np.bincount(log_of[pauses], minlength=log_count)
+        burst_counts = np.where(sizes > 0, pause_counts + 1, 0)
+        total_time = np.bincount(log_of[timed], weights=delays[timed], minlength=log_count)
+        pause_time = np.bincount(log_of[pauses], weights=delays[pauses], minlength=log_count)
+        columns.append(burst_counts.astype(np.float64))
+        columns.append(np.where(sizes > 0, sizes / burst_counts, np.nan))
+        columns.append(np.where(total_time > 0, pause_time / total_time, np.nan))
+
+        backspace_code = display_codes.get(display_key(BACKSPACE_KEY), -2)
+        backspaces = codes == backspace_code
+        backspace_bursts = backspaces & (previous_codes != backspace_code)
+        backspace_counts = np.bincount(log_of[backspaces], minlength=log_count)
+        burst_starts = np.bincount(log_of[backspace_bursts], minlength=log_count)
+        columns.append(np.where(sizes > 0, backspace_counts / sizes, np.nan))
+        columns.append(np.where(sizes > 0, burst_starts / sizes, np.nan))
+
+    if log_count == 0:
+        return np.empty((0, len(schema.names())), dtype=np.float64)
+    return np.column_stack(columns).astype(np.float64)
+
+
+class FeatureMatrix:
+    """
+    Fixed-length feature vectors of a log set, one row per log.
+
+    Attributes:
+    ----------
+    - ids (`list[str]`): The id of each row's log.
+    - names (`list[str]`): The name of each column.
+    - matrix (`np.ndarray`): Float features of shape (logs, features).
+    - digest (`str`): The combined digest of the logs.
+    - signature (`str`): The signature of the schema used.
+    """
+
+    def __init__(self, ids: list[str], names: list[str], matrix: 'np.ndarray',
+                 digest: str, signature: str) -> None:
+        self.ids = ids
+        self.names = names
+        self.matrix = matrix
+        self.digest = digest
+        self.signature = signature
+
+    @classmethod
+    def from_arrays(cls, arrays: KeyArrays, schema: FeatureSchema,
+                    digest: str) -> 'FeatureMatrix':
+        return cls(list(arrays.ids), schema.names(), extract_features(arrays, schema),
+                   digest, schema.signature())
+
+    @classmethod
+    def load(cls, filepath: str, ids: list[str], digest: str,
+             signature: str) -> 'FeatureMatrix | None':
+        """
+        Read a matrix file. Returns None if it is missing, corrupt, or for other logs or schema.
+        """
+        if not path.exists(filepath):
+            return None
+        try:
+            with np.load(filepath, allow_pickle=False) as data:
+                if str(data["digest"]) != digest or str(data["signature"]) != signature:
+                    return None
+                matrix = data["matrix"]
+                names = [str(name) for name in data["names"]]
+            if matrix.shape != (len(ids), len(names)):
+                return None
+            return cls(ids, names, matrix, digest, signature)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable feature cache: {e}")
+            return None
+
+    def save(self, filepath: str) -> None:
+        """
+        Write the matrix file, replacing it atomically.
+        """
+        temp_path = filepath + '.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                np.savez(f, matrix=self.matrix, names=np.array(self.names),
+                         digest=np.array(self.digest), signature=np.array(self.signature))
+            replace(temp_path, filepath)
+        except OSError as e:
+            logging.warning(f"Unable to save feature cache: {e}")
+
+    def column(self, name: str) -> 'np.ndarray':
+        if name not in self.names:
+            raise ValueError(f"No feature named {name}.")
+        return self.matrix[:, self.names.index(name)]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        return f"FeatureMatrix({len(self.ids)} logs x {len(self.names)} features)"
@@ -1,12 +1,26 @@
 # KeyMaster imports
 from utils.helpers import get_filepath, resolve_filename
-from utils.validation import KeystrokeDecoder, KeystrokeList, Log, KeystrokeEncoder
-from utils.settings import ROUND_DIGITS, STOP_KEY, OUTLIER_CUTOFF
+from utils.validation import KeystrokeDecoder, KeystrokeList, Log, dump_logs, log_digest
+from utils.settings import ROUND_DIGITS, STOP_KEY, OUTLIER_CUTOFF, CACHE_METRICS, MEMO_SIZE, BURST_PAUSE
+from utils.constants import SPECIAL_KEY_DISPLAY_NAMES
+from utils.diagnostics import DIAGNOSTICS, OUTLIER
+from utils.metrics import DelayStats, DigraphStats, ErrorMetrics, LogSummary, QuantileSketch, RollingSeries, Segment, TimingProfile
+from utils.metrics import active_stats, cohens_d, iter_segments, merge_key_times, rolling_series, WINDOW_KEYSTROKES
+from classes.features import FeatureMatrix, FeatureSchema, extract_features, get_feature_cache_path
+from classes.key_arrays import KeyArrays
+from classes.metric_cache import MetricCache, get_metric_cache_path
+from classes.similarity import Neighbor, SimilarityIndex
+from classes.string_index import NgramIndex, SearchHit, combine_digests, get_ngram_index_path, strings_digest
+from utils.schema import SCHEMA_VERSION, LEGACY_SCHEMA_VERSION, make_schema_header, split_schema_header
 
 # Standard library imports
+from collections import OrderedDict
+from copy import copy
+from functools import wraps
+from inspect import signature
+from itertools import chain
 from json import load as json_load
-from json import dump as json_dump
-import statistics
+from typing import Any, Callable, TypeVar
 import logging
 logging.basicConfig(encoding='utf-8', level=logging.INFO)
 
@@ -16,6 +30,45 @@ try:
 except ImportError:
     plt = None  # type: ignore
 
+Method = TypeVar('Method', bound=Callable[..., Any])
+MEMO_KEY_ARGUMENTS = ('self', 'keystrokes', 'exclude_outliers', 'km_id')
+
+
+def memoized(method: Method) -> Method:
+    """
+    Memoize a KeyParser method per (log set state, keystrokes digest, exclude_outliers, km_id),
+    plus any other argument passed. Results are copied on the way out so callers cannot corrupt the cache.
+    """
+    method_signature = signature(method)
+
+    @wraps(method)
+    def wrapper(self: 'KeyParser', *args: Any, **kwargs: Any) -> Any:
+        arguments = method_signature.bind(self, *args, **kwargs).arguments
+        keystrokes = arguments.get('keystrokes')
+        exclude_outliers = arguments.get('exclude_outliers')
+        if exclude_outliers is None:
+            exclude_outliers = self.exclude_outliers
+        key = (method.__name__,
+               None if keystrokes is None else keystrokes.digest(),
+               exclude_outliers,
+               arguments.get('km_id'),
+               *(value for name, value in arguments.items()
+                 if name not in MEMO_KEY_ARGUMENTS))
+        state = self.get_log_set_state()
+        if self._memo_version != state:
+            self._memo.clear()
+            self._memo_version = state
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            self.memo_hits += 1
+            return copy(self._memo[key])
+        result = method(self, *args, **kwargs)
+        self._memo[key] = result
+        if len(self._memo) > MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return copy(result)
+    return wrapper  # type: ignore
+
 
 class KeyParser:
     """
@@ -26,31 +79,135 @@ class KeyParser:
     - filename (`str`): The filename of the log file.
     - exclude_outliers (`bool`): A flag indicating whether to exclude outliers.
     - logs (`list`): A list of Log objects.
+    - version (`int`): Incremented whenever the logs are replaced or marked modified.
+    - schema_version (`int`): The logfile format version, kept when saving.
+    - cache_metrics (`bool`): Whether whole-store metrics merge cached per-log summaries.
     """
 
     def __init__(self, filename: str | None = 'REG',
                  exclude_outliers: bool = True,
-                 preload: bool = True) -> None:
+                 preload: bool = True,
+                 cache_metrics: bool = CACHE_METRICS) -> None:
         """
         Initialize the KeyParser and load logs. None value for filename will initialize an empty KeyParser.
         """
         self.filename = filename  # Client facing.
         self.exclude_outliers = exclude_outliers  # Client facing.
+        self.cache_metrics = cache_metrics  # Client facing.
         # Not client facing.
-        self.logs: list[Log] = []
+        self.version = 0
+        self.schema_version = SCHEMA_VERSION
+        self._logs: list[Log] = []
+        # Digests of the logs as they are in the logfile. None if unknown.
+        self.saved_digests: list[str] | None = None
+        self._key_arrays: KeyArrays | None = None
+        self._key_arrays_version: tuple[int, int] | None = None
+        self._digests: list[str] = []
+        self._digests_version: tuple[int, int] | None = None
+        self.metric_cache: MetricCache | None = None
+        # LRU of derived results, cleared whenever the version changes
+        self._memo: OrderedDict[tuple, Any] = OrderedDict()
+        self._memo_version: tuple[int, int] | None = None
+        self.memo_hits = 0
+        # Positions of the first log with each id and each exact string
+        self._id_index: dict[str, int] = {}
+        self._string_index: dict[str, int] = {}
+        self._index_version = -1
+        self._index_length = -1
+        self._ngram_index: NgramIndex | None = None
+        self._ngram_index_version: tuple[int, int] | None = None
+        self._feature_matrix: FeatureMatrix | None = None
+        self._feature_matrix_version: tuple[int, int] | None = None
+        self._similarity_index: SimilarityIndex | None = None
+        # Every keystroke of the store as one shared list, with log boundaries
+        self._store_keystrokes: KeystrokeList | None = None
+        self._store_offsets: list[int] = []
+        self._store_version = -1
         if preload:
-            self.logs = self.extract_logs()
+            self.load_logs()
             logging.info(f"Loaded {len(self.logs)} logs.")
 
+    @property
+    def logs(self) -> list[Log]:
+        return self._logs
+
+    @logs.setter
+    def logs(self, logs: list[Log]) -> None:
+        self._logs = logs
+        self.version += 1
+
+    def mark_modified(self) -> None:
+        """Client facing.
+        Bump the version of the log set. Call this after mutating logs in place.
+        Cached digests and timestamps of every log are cleared too.
+        """
+        for log in self.logs:
+            log['keystrokes'].invalidate()
+        self.version += 1
+
+    def get_log_set_state(self) -> tuple[int, int]:
+        """Not client facing.
+        Identifies the log set for derived caches: its version and its length.
+        Appending a log changes the state even without mark_modified.
+        """
+        return self.version, len(self.logs)
+
+    def get_key_arrays(self) -> KeyArrays:
+        """Client facing.
+        Get a NumPy-backed view of the logs for vectorized analysis.
+        The view is built once per log set state.
+        """
+        state = self.get_log_set_state()
+        if self._key_arrays is None or self._key_arrays_version != state:
+            self._key_arrays = KeyArrays(self.logs)
+            self._key_arrays_version = state
+        return self._key_arrays
+
     def load_logs(self) -> None:
         """Client facing.
         Load logs from the file.
         """
         self.logs = self.extract_logs()
+        self.saved_digests = self.get_digests()
+
+    def get_digests(self) -> list[str]:
+        """Not client facing.
+        Returns the content digest of each loaded log. Computed once per log set state.
+        """
+        state = self.get_log_set_state()
+        if self._digests_version != state:
+            self._digests = [log_digest(log) for log in self.logs]
+            self._digests_version = state
+        return self._digests
+
+    def get_log_summaries(self) -> list[LogSummary]:
+        """Not client facing.
+        Get the partial aggregates of each log. Unchanged logs are read from
+        the metric cache next to the logfile, and new or changed logs are summarized and saved.
+        """
+        cache_path = get_metric_cache_path(
+            get_filepath(self.filename) if self.filename else None)
+        if self.metric_cache is None or self.metric_cache.filepath != cache_path:
+            self.metric_cache = MetricCache(cache_path)
+        summaries = self.metric_cache.get_summaries(
+            self.logs, self.get_digests())
+        self.metric_cache.save()
+        return summaries
+
+    def has_unsaved_changes(self) -> bool:
+        """Client facing.
+        Check whether the loaded logs differ from the logfile, without re-reading it.
+        """
+        if self.saved_digests is None:
+            # The logfile was never loaded, so assume it differs
+            return True
+        if len(self.saved_digests) != len(self.logs):
+            return True
+        return self.get_digests() != self.saved_digests
 
     def extract_logs(self) -> list[Log]:
         """Not client facing.
-        Reads logfile and extracts logs.
+        Reads logfile and extracts logs. Sets schema_version from the logfile header.
 
         Returns:
             `list`: A list of logs loaded from the file. If an error occurs, an empty list is returned.
@@ -64,10 +221,15 @@ class KeyParser:
             return []
         try:
             with open(filepath, 'r') as f:
-                logs: list[Log] = json_load(f, cls=KeystrokeDecoder)
+                entries = json_load(f, cls=KeystrokeDecoder)
+            self.schema_version, logs = split_schema_header(entries)
+            if self.schema_version < SCHEMA_VERSION:
+                logging.info(
+                    f"Logfile uses schema version {self.schema_version}. Run scripts.migrate to upgrade.")
             return logs
         except FileNotFoundError:
             logging.warning("No log file found.")
+            self.schema_version = SCHEMA_VERSION
             return []
         except Exception as e:
             logging.error(f"An error occurred! {e}")
@@ -97,10 +259,47 @@ class KeyParser:
                     logging.info('Exact string not found.')
             return False
         else:
-            for unchecked_log in self.logs:
-                if unchecked_log['id'] == km_id:
-                    return True
-            return False
+            return self.find_log_index(km_id) is not None
+
+    def build_index(self) -> None:
+        """Not client facing.
+        Rebuild the id and exact string indexes if the logs changed since the last build.
+        """
+        if self._index_version == self.version and self._index_length == len(self.logs):
+            return
+        self._id_index = {}
+        self._string_index = {}
+        for position, log in enumerate(self.logs):
+            self._id_index.setdefault(log['id'], position)
+            self._string_index.setdefault(log['string'], position)
+        self._index_version = self.version
+        self._index_length = len(self.logs)
+
+    def find_log_index(self, km_id: str) -> int | None:
+        """Not client facing.
+        Get the position of the first log matching an id, or an exact string formatted as STOP_KEY + string.
+
+        Returns:
+            `int` or `None`: The position in logs. None if no log matches.
+        """
+        if not km_id:
+            return None
+        self.build_index()
+        positions = []
+        if km_id in self._id_index:
+            positions.append(self._id_index[km_id])
+        if km_id[0] == STOP_KEY and km_id[1:] in self._string_index:
+            positions.append(self._string_index[km_id[1:]])
+        return min(positions) if positions else None
+
+    def find_log(self, km_id: str) -> Log:
+        """Not client facing.
+        Get the first log matching an id or exact string. Raises a ValueError if none does.
+        """
+        position = self.find_log_index(km_id)
+        if position is None:
+            raise ValueError("ID invalid.")
+        return self.logs[position]
 
     def id_by_index(self, index: int) -> str | None:
         """Client facing.
@@ -137,10 +336,129 @@ class KeyParser:
         Returns:
             `str` or `None`: The ID of the first log that contains the substring. If no such log is found, `None` is returned.
         """
-        for log in self.logs:
-            if keyword == log['string'] or keyword in log['string']:
-                return log['id']
-        return None
+        hits = self.search_strings(keyword, limit=1)
+        return hits[0]['id'] if hits else None
+
+    def get_ngram_index(self) -> NgramIndex:
+        """Not client facing.
+        Get the trigram index of the log strings. It is loaded from next to the logfile
+        when it still matches the logs, and rebuilt and saved otherwise.
+        """
+        state = self.get_log_set_state()
+        if self._ngram_index is not None and self._ngram_index_version == state:
+            return self._ngram_index
+        ids = [log['id'] for log in self.logs]
+        strings = [log['string'] for log in self.logs]
+        # Only ids and strings matter, so delay edits keep the index
+        digest = strings_digest(ids, strings)
+        self._ngram_index_version = state
+        if self._ngram_index is not None and self._ngram_index.digest == digest:
+            return self._ngram_index
+        index_path = get_ngram_index_path(
+            get_filepath(self.filename) if self.filename else None)
+        index = None
+        if index_path is not None:
+            index = NgramIndex.load(index_path, ids, strings, digest)
+        if index is None:
+            index = NgramIndex(ids, strings, digest)
+            if index_path is not None and self.logs:
+                index.save(index_path)
+        self._ngram_index = index
+        return index
+
+    def get_feature_matrix(self, schema: FeatureSchema | None = None) -> FeatureMatrix:
+        """Client facing.
+        Get a feature vector per log, as a dense matrix extracted in one vectorized pass.
+        The matrix is loaded from next to the logfile when it still matches the logs
+        and schema, and extracted and saved otherwise.
+
+        Args:
+            `schema` (`FeatureSchema`, optional): The features. Defaults to FeatureSchema().
+
+        Returns:
+            `FeatureMatrix`: The matrix with the id of each row and the name of each column.
+        """
+        if schema is None:
+            schema = FeatureSchema()
+        signature = schema.signature()
+        features = self._feature_matrix
+        state = self.get_log_set_state()
+        if features is not None and features.signature == signature and \
+                self._feature_matrix_version == state:
+            return features
+        digest = combine_digests(self.get_digests())
+        self._feature_matrix_version = state
+        if features is not None and features.signature == signature and features.digest == digest:
+            return features
+        ids = [log['id'] for log in self.logs]
+        cache_path = get_feature_cache_path(
+            get_filepath(self.filename) if self.filename else None)
+        features = None
+        if cache_path is not None:
+            features = FeatureMatrix.load(cache_path, ids, digest, signature)
+        if features is None:
+            features = FeatureMatrix.from_arrays(self.get_key_arrays(), schema, digest)
+            if cache_path is not None and self.logs:
+                features.save(cache_path)
+        self._feature_matrix = features
+        return features
+
+    def get_similarity_index(self, schema: FeatureSchema | None = None) -> SimilarityIndex:
+        """Not client facing.
+        Get the nearest-neighbor index over the feature matrix. Rebuilt when the matrix changes.
+        """
+        features = self.get_feature_matrix(schema)
+        if self._similarity_index is None or self._similarity_index.features is not features:
+            self._similarity_index = SimilarityIndex(features)
+        return self._similarity_index
+
+    def find_similar(self,
+                     query: str | KeystrokeList,
+                     k: int = 5,
+                     schema: FeatureSchema | None = None,
+                     approximate: bool | None = None) -> list[Neighbor]:
+        """Client facing.
+        Find the logs whose timing profile looks most like a log or a keystroke list.
+
+        Args:
+            `query` (`str` | `KeystrokeList`): A UUID or exact string, or keystrokes.
+            `k` (`int`): The number of logs to return.
+            `schema` (`FeatureSchema`, optional): The features compared. Defaults to FeatureSchema().
+            `approximate` (`bool`, optional): Only search the nearest clusters. Defaults to
+            True for stores of at least SIMILARITY_IVF_THRESHOLD logs.
+
+        Returns:
+            `list[Neighbor]`: Dicts with the log index, id and distance, closest first.
+            A log id query leaves out the log itself.
+        """
+        index = self.get_similarity_index(schema)
+        if isinstance(query, KeystrokeList):
+            if schema is None:
+                schema = FeatureSchema()
+            query_arrays = KeyArrays([{'id': '', 'string': '', 'keystrokes': query}])
+            return index.search(extract_features(query_arrays, schema)[0], k, approximate)
+        log_index = self.find_log_index(query)
+        if log_index is None:
+            raise ValueError("ID invalid.")
+        return index.search(index.features.matrix[log_index], k, approximate,
+                            exclude=log_index)
+
+    def search_strings(self, keyword: str, limit: int | None = None,
+                       ranked: bool = False) -> list[SearchHit]:
+        """Client facing.
+        Find every log whose string contains a substring, using a trigram index.
+
+        Args:
+            `keyword` (`str`): The substring to search for.
+            `limit` (`int`, optional): The maximum number of hits.
+            `ranked` (`bool`): Order by number of matches instead of log order.
+
+        Returns:
+            `list[SearchHit]`: Dicts with the log index, id and the offset of every match.
+        """
+        if not self.logs:
+            return []
+        return self.get_ngram_index().search(keyword, limit, ranked)
 
     def get_strings(self, km_id: str | None = None) -> list[str]:
         """Client facing.
@@ -157,17 +475,9 @@ class KeyParser:
         """
         if not self.logs:
             return []
-        # Check if km_id is provided and valid
+        # If km_id is valid, find the associated string and return it
         if km_id is not None:
-            if not self.is_id_present(km_id):
-                raise ValueError("ID invalid.")
-
-            # If km_id is valid, find the associated string and return it
-            for log in self.logs:
-                if self.is_id_present(km_id, log):
-                    return [log['string']]
-        # If no km_id is provided or no matching string is found, return all
-        # strings
+            return [self.find_log(km_id)['string']]
         return [log['string'] for log in self.logs]
 
     def print_strings(self,
@@ -198,6 +508,7 @@ class KeyParser:
                 curr_string = curr_string[:truncate] + "[...]"
             logging.info(f'{count}|{curr_string}')
 
+    @memoized
     def get_only_times(self,
                        keystrokes: KeystrokeList | None = None,
                        exclude_outliers: bool | None = None,
@@ -207,37 +518,97 @@ class KeyParser:
         Get a list of all keystroke delay times.
 
         Args:
+            `keystrokes` (`KeystrokeList`, optional): Takes priority over km_id.
             `km_id` (str, optional): The UUID or exact string to check for.
 
         Returns:
             `list[float]`: A list of float values.
         """
-        if km_id is not None:
-            if not self.is_id_present(km_id):
-                raise ValueError("ID invalid.")
-        keystrokes = self.get_keystrokes(km_id)
+        if keystrokes is None:
+            keystrokes = self.read_keystrokes(km_id)
         if keystrokes.is_empty():
             logging.warning("No keystrokes found.")
             return []
         if exclude_outliers is None:
             exclude_outliers = self.exclude_outliers
-        outlier_count = 0
-        outliers = []
         times: list[float] = []
         for keystroke in keystrokes:
             time = keystroke.time
             if time is None:
                 continue
             elif time > OUTLIER_CUTOFF and exclude_outliers:
-                outliers.append((keystroke.key, time))
-                outlier_count += 1
+                DIAGNOSTICS.record(OUTLIER, (keystroke.key, time))
                 continue
             else:
                 times.append(time)
-        if outlier_count > 0:
-            logging.info(f"{outlier_count} Outlier times removed:\n{outliers}")
         return times
 
+    def get_store_keystrokes(self) -> KeystrokeList:
+        """Not client facing.
+        Get every keystroke of the store as one list, built once per version of the log set.
+        Log i spans store_offsets[i]:store_offsets[i + 1]. The list is shared, so never modify it.
+        """
+        if self._store_keystrokes is None or self._store_version != self.version \
+                or len(self._store_offsets) != len(self.logs) + 1:
+            keystrokes: list = []
+            offsets = [0]
+            for log in self.logs:
+                keystrokes.extend(log['keystrokes'].keystrokes)
+                offsets.append(len(keystrokes))
+            self._store_keystrokes = KeystrokeList(keystrokes)
+            self._store_offsets = offsets
+            self._store_version = self.version
+        return self._store_keystrokes
+
+    @property
+    def store_offsets(self) -> list[int]:
+        self.get_store_keystrokes()
+        return self._store_offsets
+
+    def read_keystrokes(self, km_id: str | None = None) -> KeystrokeList:
+        """Not client facing.
+        Get the keystrokes of the log matching km_id, or of every log, without copying them.
+        For read-only use. get_keystrokes returns a list that can be modified.
+        """
+        if km_id is None:
+            return self.get_store_keystrokes()
+        return self.find_log(km_id)['keystrokes']
+
+    def get_keystroke_lists(self, km_id: str | None = None) -> list[KeystrokeList]:
+        """Not client facing.
+        Get the keystroke list of each log, or of the log matching km_id, without concatenating them.
+        """
+        if km_id is None:
+            return [log['keystrokes'] for log in self.logs]
+        return [self.find_log(km_id)['keystrokes']]
+
+    def aggregate_delays(self,
+                         keystrokes: KeystrokeList | None = None,
+                         exclude_outliers: bool | None = None,
+                         km_id: str | None = None) -> DelayStats:
+        """Not client facing.
+        Collect every delay statistic in a single pass.
+
+        Args:
+            `keystrokes` (`KeystrokeList`, optional): Takes priority over km_id.
+            `km_id` (str, optional): The UUID or exact string to check for.
+
+        Returns:
+            `DelayStats`: Count, sum, max, mean, variance and outlier count of the delays.
+        """
+        if exclude_outliers is None:
+            exclude_outliers = self.exclude_outliers
+        stats = DelayStats()
+        if keystrokes is not None:
+            return stats.add_keystrokes(keystrokes, exclude_outliers)
+        if km_id is None and self.cache_metrics:
+            for summary in self.get_log_summaries():
+                stats.merge(summary.delays(exclude_outliers))
+            return stats
+        for keystroke_list in self.get_keystroke_lists(km_id):
+            stats.add_keystrokes(keystroke_list, exclude_outliers)
+        return stats
+
     def wpm(self,
             keystrokes: KeystrokeList | None = None,
             exclude_outliers: bool | None = None,
@@ -252,38 +623,118 @@ class KeyParser:
         Returns:
             `float` or `None`: If no characters are found, None is returned.
         """
+        # Prioritize keystrokes over km_id
+        if keystrokes is None and not self.logs:
+            logging.warning("No logs found.")
+            return None
+        wpm = self.aggregate_delays(keystrokes, exclude_outliers, km_id).wpm()
+        if wpm is None:
+            logging.warning(
+                "Num_chars or total_seconds is 0. Unable to get WPM.")
+        return wpm
+
+    def get_percentiles(
+            self,
+            percentiles: tuple[float, ...] = (50, 90, 95, 99),
+            keystrokes: KeystrokeList | None = None,
+            exclude_outliers: bool | None = None,
+            km_id: str | None = None) -> dict[float, float] | None:
+        """Client facing.
+        Get percentiles of the time between keystrokes, from a quantile sketch.
+        Whole-store queries merge the cached per-log sketches instead of re-reading keystrokes.
+
+        Args:
+            `percentiles` (`tuple[float, ...]`): The percentiles to get, from 0 to 100.
+            `km_id` (`str`, optional): The UUID or exact string to check for.
 
-        num_chars = 0
-        total_seconds = 0
-        # If id is provided, calculate WPM for specific log
+        Returns:
+            `dict[float, float]` or `None`: Percentile to delay in seconds. None if no keystroke times are found.
+        """
         if exclude_outliers is None:
             exclude_outliers = self.exclude_outliers
-        if keystrokes is None:
-            # Prioritize keystrokes over km_id
-            if not self.logs:
-                logging.warning("No logs found.")
-                return None
-            if km_id is not None:
-                if not self.is_id_present(km_id):
-                    raise ValueError("ID invalid.")
-            times = self.get_only_times(
-                exclude_outliers=exclude_outliers, km_id=km_id)
-            num_chars = len(times)
-            total_seconds = sum(times)  # type: ignore
-            # If id is not provided, calculate WPM for all logs
+        sketch = QuantileSketch()
+        if keystrokes is None and km_id is None and self.cache_metrics:
+            for summary in self.get_log_summaries():
+                sketch.merge(summary.inlier_sketch)
+                if not exclude_outliers:
+                    sketch.merge(summary.outlier_sketch)
         else:
-            times = self.get_only_times(
-                keystrokes, exclude_outliers=exclude_outliers,)
-            num_chars = len(times)
-            total_seconds = sum(times)  # type: ignore
-        if num_chars == 0 or total_seconds == 0:
-            logging.warning(
-                "Num_chars or total_seconds is 0. Unable to get WPM.")
+            keystroke_lists = [keystrokes] if keystrokes is not None \
+                else self.get_keystroke_lists(km_id)
+            for keystroke_list in keystroke_lists:
+                for keystroke in keystroke_list:
+                    time = keystroke.time
+                    if time is None or (exclude_outliers and time > OUTLIER_CUTOFF):
+                        continue
+                    sketch.add(time)
+        if sketch.count == 0:
+            logging.warning("No keystroke times found.")
             return None
+        return sketch.quantiles(percentiles)  # type: ignore
+
+    def get_rolling_series(
+            self,
+            window: float = 20,
+            unit: str = WINDOW_KEYSTROKES,
+            keystrokes: KeystrokeList | None = None,
+            exclude_outliers: bool | None = None,
+            km_id: str | None = None) -> RollingSeries:
+        """Client facing.
+        Get rolling WPM, mean delay and outlier rate over a session.
 
-        # Calculate the CPM
-        cpm = (num_chars / total_seconds) * 60
-        return round(cpm / 5, 1)
+        Args:
+            `window` (`float`): The window size, in keystrokes or seconds.
+            `unit` (`str`): 'keystrokes' or 'seconds'.
+            `km_id` (`str`, optional): The UUID or exact string to check for.
+
+        Returns:
+            `RollingSeries`: Parallel lists with the end index, elapsed time and metrics of each window.
+        """
+        if exclude_outliers is None:
+            exclude_outliers = self.exclude_outliers
+        if keystrokes is None:
+            # Shared lists keep their cached timestamps between calls
+            keystrokes = self.read_keystrokes(km_id)
+        return rolling_series(keystrokes, window, unit, exclude_outliers)
+
+    def get_segments(
+            self,
+            pause: float = BURST_PAUSE,
+            keystrokes: KeystrokeList | None = None,
+            km_id: str | None = None) -> list[Segment]:
+        """Client facing.
+        Split keystrokes into typing bursts (or sessions, with a longer pause) at every delay above `pause`.
+
+        Args:
+            `pause` (`float`): The longest delay, in seconds, that does not end a segment.
+            `keystrokes` (`KeystrokeList`, optional): Takes priority over km_id.
+            `km_id` (`str`, optional): The UUID or exact string to check for.
+
+        Returns:
+            `list[Segment]`: Segment boundaries and statistics. For the whole store,
+            `log_index` is the position of the log.
+        """
+        if keystrokes is not None:
+            return list(iter_segments(keystrokes, pause))
+        return list(iter_segments(self.get_keystroke_lists(km_id), pause))
+
+    def get_active_stats(
+            self,
+            pause: float = BURST_PAUSE,
+            keystrokes: KeystrokeList | None = None,
+            km_id: str | None = None) -> dict[str, int | float | None] | None:
+        """Client facing.
+        Get statistics of active typing only, leaving out every pause longer than `pause`.
+        Same keys as DelayStats.format_stats, where outlier_count is always 0 and pauses are not counted.
+        """
+        keystroke_lists = [keystrokes] if keystrokes is not None \
+            else self.get_keystroke_lists(km_id)
+        keystroke_count = sum(len(keystroke_list)
+                              for keystroke_list in keystroke_lists)
+        if keystroke_count == 0:
+            logging.warning("No keystrokes found.")
+            return None
+        return active_stats(iter_segments(keystroke_lists, pause)).format_stats(keystroke_count)
 
     def get_highest_keystroke_times(
             self,
@@ -302,22 +753,27 @@ class KeyParser:
             logging.warning("No logs found.")
             return []
         if km_id is not None:
-            if not self.is_id_present(km_id):
-                raise ValueError("ID invalid.")
-            times = self.get_only_times(
-                exclude_outliers=exclude_outliers, km_id=km_id)
-            if len(times) == 0:
+            highest = self.aggregate_delays(
+                exclude_outliers=exclude_outliers, km_id=km_id).max
+            if highest is None:
                 logging.warning("No keystroke times found.")
                 return []
-            return [(km_id, max(times))]
+            return [(km_id, highest)]
         highest_times: list[tuple[str, float]] = []
+        if self.cache_metrics:
+            if exclude_outliers is None:
+                exclude_outliers = self.exclude_outliers
+            for log, summary in zip(self.logs, self.get_log_summaries()):
+                highest = summary.delays(exclude_outliers).max
+                if highest is not None:
+                    highest_times.append((log['id'], highest))
+            return highest_times
         # iterate through logs
         for log in self.logs:
-            keystrokes = log['keystrokes']
-            times = self.get_only_times(
-                keystrokes, exclude_outliers=exclude_outliers)
-            if times:
-                highest_times.append((log['id'], max(times)))
+            highest = self.aggregate_delays(
+                log['keystrokes'], exclude_outliers).max
+            if highest is not None:
+                highest_times.append((log['id'], highest))
         return highest_times
 
     def get_average_delay(
@@ -334,18 +790,12 @@ class KeyParser:
         Returns:
             `float` or `None`: Return average delay in seconds. If no keystroke times are found, None is returned.
         """
-        times = []
-        if keystrokes is None:
-            if km_id is not None:
-                if not self.is_id_present(km_id):
-                    raise ValueError("ID invalid.")
-            times = self.get_only_times(
-                exclude_outliers=exclude_outliers, km_id=km_id)
-        times = self.get_only_times(keystrokes, exclude_outliers)
-        if len(times) == 0:
+        average = self.aggregate_delays(
+            keystrokes, exclude_outliers, km_id).average()
+        if average is None:
             logging.warning("No keystrokes found.")
             return None
-        return round(sum(times) / len(times), 4)
+        return round(average, 4)
 
     def get_std_deviation(
             self,
@@ -361,21 +811,13 @@ class KeyParser:
         Returns:
             `float` or `None`: If insufficient keystrokes are found, None is returned.
         """
-        times = []
-        if keystrokes is None:
-            if km_id is not None:
-                if not self.is_id_present(km_id):
-                    raise ValueError("ID invalid.")
-            times = self.get_only_times(
-                exclude_outliers=exclude_outliers, km_id=km_id)
-        else:
-            times = self.get_only_times(
-                keystrokes, exclude_outliers)
-        if len(times) < 2:
+        std_deviation = self.aggregate_delays(
+            keystrokes, exclude_outliers, km_id).std_deviation()
+        if std_deviation is None:
             logging.warning(
                 "Not enough keystrokes to calculate standard deviation.")
             return None
-        return round(statistics.stdev(times), ROUND_DIGITS)
+        return round(std_deviation, ROUND_DIGITS)
 
     def plot_boxplot(
             self,
@@ -443,6 +885,36 @@ class KeyParser:
         plt.show(block=display)
         return
 
+    def plot_series(self,
+                    series: RollingSeries,
+                    metric: str = 'wpm',
+                    save_file: bool = False,
+                    display: bool = True) -> None:
+        """Not client facing.
+        Plots a rolling metric against the elapsed time.
+
+        Args:
+            `series` (`RollingSeries`): The output of get_rolling_series.
+            `metric` (`str`): 'wpm', 'mean_delay' or 'outlier_rate'.
+        """
+        if plt is None:
+            logging.warning("Matplotlib not installed. Cannot visualize.")
+            return
+        if not series['index']:
+            logging.warning("No full windows to plot.")
+            return
+        values = [float('nan') if value is None else value
+                  for value in series[metric]]  # type: ignore
+        plt.figure(figsize=(15, 10))
+        plt.plot(series['elapsed'], values, color='skyblue')
+        plt.xlabel('Elapsed Time (s)')
+        plt.ylabel(metric)
+        plt.title(f'Rolling {metric}')
+        plt.tight_layout()
+        if save_file:
+            plt.savefig(f'rolling_{metric}.png', dpi=200)
+        plt.show(block=display)
+
     def visualize(
             self,
             mode: str | None = None,
@@ -451,7 +923,8 @@ class KeyParser:
             exclude_outliers: bool | None = None,
             km_id: str | None = None) -> None:
         """Client facing.
-        Plots the average keystroke time for each character.
+        Plots the average keystroke time for each character ('bar'), the keystroke times ('box'),
+        or the rolling WPM over the session ('rolling').
 
         Args:
             `km_id` (`str`, optional): The UUID or exact string to check for.
@@ -461,7 +934,9 @@ class KeyParser:
         if km_id is not None:
             if not self.is_id_present(km_id):
                 raise ValueError("ID invalid.")
-        keystrokes = self.get_keystrokes(km_id)
+        whole_store = keystrokes is None and km_id is None
+        if keystrokes is None:
+            keystrokes = self.read_keystrokes(km_id)
 
         if keystrokes.is_empty():
             logging.warning("No keystrokes found.")
@@ -473,14 +948,18 @@ class KeyParser:
         if mode is None:
             mode = 'bar'
         if mode == 'bar':
+            # The whole store is memoized without hashing the concatenated keystrokes
             character_times = self.map_chars_to_times(
-                keystrokes, exclude_outliers)
+                None if whole_store else keystrokes, exclude_outliers)
             if not character_times:  # If no characters found
                 logging.warning("No characters to visualize.")
                 return
             self.plot_bar(character_times, save_file=save_file)
         elif mode == 'box':
             self.plot_boxplot(keystrokes, exclude_outliers)
+        elif mode == 'rolling':
+            self.plot_series(self.get_rolling_series(
+                keystrokes=keystrokes, exclude_outliers=exclude_outliers), save_file=save_file)
 
     def get_keystrokes(self, km_id: str | None = None) -> KeystrokeList:
         """Client facing.
@@ -492,35 +971,16 @@ class KeyParser:
         Returns:
             list: A list of Keystroke items.
         """
-        keystrokes = KeystrokeList()
-        if km_id is not None:
-            if not self.is_id_present(km_id):
-                raise ValueError("ID invalid.")
-        for log in self.logs:
-            if km_id is None:
-                keystrokes.extend(log['keystrokes'])
-            else:
-                if self.is_id_present(km_id, log):
-                    keystrokes.extend(log['keystrokes'])
-                    return keystrokes
-        return keystrokes
+        return KeystrokeList(list(self.read_keystrokes(km_id).keystrokes))
 
     def refactor_special_key(self, key: str) -> str:
         """Not client facing.
         Replace special key names with more readable versions for display.
         These may be changed in the future.
         """
-        display_names = {
-            "'STOP'": "Stop",
-            "'Key.space'": "Space",
-            "'Key.enter'": "Enter",
-            "'Key.backspace'": "Backspace",
-            "'Key.tab'": "Tab",
-            "'Key.caps_lock'": "Caps Lock",
-            "'Key.shift'": "Shift",
-        }
-        return display_names.get(key, key)
+        return SPECIAL_KEY_DISPLAY_NAMES.get(key, key)
 
+    @memoized
     def map_chars_to_times(self,
                            keystrokes: KeystrokeList | None = None,
                            exclude_outliers: bool | None = None) -> dict[str,
@@ -536,17 +996,20 @@ class KeyParser:
         """
         character_times: dict[str, float] = {}
         character_counts: dict[str, int] = {}
+        if exclude_outliers is None:
+            exclude_outliers = self.exclude_outliers
         if keystrokes is None:
-            keystrokes = self.get_keystrokes()
+            if self.cache_metrics:
+                character_times = merge_key_times(
+                    self.get_log_summaries(), exclude_outliers)
+                if not character_times:
+                    logging.warning("No character times to map.")
+                return character_times
+            keystrokes = self.get_store_keystrokes()
         if keystrokes.is_empty():
             logging.warning("No keystrokes to map.")
             return {}
-        # Else ensure keystrokes are valid
-        if exclude_outliers is None:
-            exclude_outliers = self.exclude_outliers
 
-        outlier_count = 0
-        outliers = []
         for keystroke in keystrokes:
 
             legal_key = keystroke.legal_key
@@ -560,8 +1023,7 @@ class KeyParser:
             if time is None:
                 continue
             if time > OUTLIER_CUTOFF and exclude_outliers:
-                outlier_count += 1
-                outliers.append((key, time))
+                DIAGNOSTICS.record(OUTLIER, (key, time))
                 continue
             if key in character_times:
                 character_times[key] += time
@@ -575,17 +1037,104 @@ class KeyParser:
         if not character_times:
             logging.warning("No character times to map.")
             return {}
-        if outlier_count > 0:
-            logging.info(f"{outlier_count} Outliers removed:\n{outliers}")
         return character_times
 
+    def get_digraphs(self,
+                     keystrokes: KeystrokeList | None = None,
+                     exclude_outliers: bool | None = None,
+                     km_id: str | None = None) -> DigraphStats:
+        """Client facing.
+        Get the transition delays between consecutive keys, e.g. `get_digraphs().slowest(5)`.
+
+        Args:
+            `keystrokes` (`KeystrokeList`, optional): Takes priority over km_id.
+            `km_id` (`str`, optional): The UUID or exact string to check for.
+
+        Returns:
+            `DigraphStats`: Delays per key pair, with count, mean, variance and percentile queries.
+        """
+        if exclude_outliers is None:
+            exclude_outliers = self.exclude_outliers
+        digraphs = DigraphStats()
+        if keystrokes is not None:
+            return digraphs.add_keystrokes(keystrokes, exclude_outliers)
+        for keystroke_list in self.get_keystroke_lists(km_id):
+            digraphs.add_keystrokes(keystroke_list, exclude_outliers)
+        return digraphs
+
     def compare_keystroke_lists(
-            self, list_of_keystroke_lists: list[KeystrokeList]) -> None:
-        """Not client facing.
-        Compare the keystroke times of multiple lists of keystrokes.
+            self,
+            list_of_keystroke_lists: list[KeystrokeList | str],
+            exclude_outliers: bool | None = None,
+            baseline: int = 0) -> dict[str, Any]:
+        """Client facing.
+        Compare the keystroke times of multiple lists of keystrokes or log ids.
+        Each list is read once to build its global and per-character timing profile.
+
+        Args:
+            `list_of_keystroke_lists` (`list`): KeystrokeLists, or UUIDs / exact strings of logs.
+            `exclude_outliers` (`bool`, optional): A flag indicating whether to exclude outliers.
+            `baseline` (`int`): The position of the list every other list is compared against.
+
+        Returns:
+            `dict`: A comparison table with these keys.
+            - "labels": The id of each log, or "#i" for the i-th KeystrokeList.
+            - "global": Per list, its count, average_delay, std_deviation and wpm.
+              Also the difference in average delay from the baseline and the effect size (Cohen's d).
+            - "characters": Per character, the same comparison for each list. None where a list never typed it.
         """
-        # TODO: Utilize map_chars_to_times
-        return None
+        if not list_of_keystroke_lists:
+            raise ValueError("No keystroke lists to compare.")
+        if not 0 <= baseline < len(list_of_keystroke_lists):
+            raise ValueError("Baseline index out of range.")
+        if exclude_outliers is None:
+            exclude_outliers = self.exclude_outliers
+        labels: list[str] = []
+        profiles: list[TimingProfile] = []
+        for position, item in enumerate(list_of_keystroke_lists):
+            if isinstance(item, str):
+                labels.append(item)
+                keystrokes = self.find_log(item)['keystrokes']
+            else:
+                labels.append(f"#{position}")
+                keystrokes = item
+            profiles.append(TimingProfile.from_keystrokes(
+                keystrokes, exclude_outliers))
+
+        def compare(stats: DelayStats, base: DelayStats) -> dict[str, Any]:
+            average = stats.average()
+            base_average = base.average()
+            effect_size = cohens_d(base, stats)
+            return {
+                "count": stats.count,
+                "average_delay": None if average is None else round(average, 4),
+                "difference": None if average is None or base_average is None
+                else round(average - base_average, 4),
+                "effect_size": None if effect_size is None else round(effect_size, ROUND_DIGITS)}
+
+        base_profile = profiles[baseline]
+        global_rows = []
+        for label, profile in zip(labels, profiles):
+            row = {"label": label, **compare(profile.delays, base_profile.delays)}
+            std_deviation = profile.delays.std_deviation()
+            row["std_deviation"] = None if std_deviation is None else round(
+                std_deviation, ROUND_DIGITS)
+            row["wpm"] = profile.delays.wpm()
+            global_rows.append(row)
+
+        characters: dict[str, list[dict[str, Any] | None]] = {}
+        for profile in profiles:
+            for key in profile.keys:
+                if key not in characters:
+                    base = base_profile.keys.get(key, DelayStats())
+                    characters[key] = [
+                        compare(other.keys[key], base) if key in other.keys else None
+                        for other in profiles]
+        return {
+            "labels": labels,
+            "baseline": labels[baseline],
+            "global": global_rows,
+            "characters": characters}
 
     def nuke_duplicates(self) -> None:
         """Client facing.
@@ -623,7 +1172,8 @@ class KeyParser:
         if not self.logs:
             logging.warning("No logs loaded.")
             return
-        if self.logs == self.extract_logs():
+        digests = self.get_digests()
+        if digests == self.saved_digests:
             logging.warning("No changes made.")
             return
         if self.filename is None:
@@ -636,47 +1186,82 @@ class KeyParser:
             return
         try:
             with open(filepath, 'w') as f:
-                json_dump(self.logs, f, cls=KeystrokeEncoder)
+                if self.schema_version > LEGACY_SCHEMA_VERSION:
+                    dump_logs(
+                        chain([make_schema_header(self.schema_version)], self.logs), f)
+                else:
+                    dump_logs(self.logs, f)
                 logging.info("Logfile adjusted.")
         except Exception as e:
             logging.error(f"An error occurred: {e}")
             return
+        self.saved_digests = digests
 
+    @memoized
     def get_stats(self,
                   keystrokes: KeystrokeList | None = None,
                   exclude_outliers: bool | None = None,
                   km_id: str | None = None,
+                  include_errors: bool = True,
                   ) -> dict[str, int | float | None] | None:
         """Client facing.
         Print statistics for the given log.
+        Every statistic comes from a single pass over the keystrokes.
+        With `include_errors`, the ErrorMetrics statistics are added.
         """
-        if keystrokes is None:
-            if km_id is not None:
-                if not self.is_id_present(km_id):
-                    raise ValueError("ID invalid.")
-            keystrokes = self.get_keystrokes(km_id)
-        if keystrokes.is_empty():
-            logging.warning("No keystrokes found.")
-            return None
         if exclude_outliers is None:
             exclude_outliers = self.exclude_outliers
-        keystroke_count = len(keystrokes)
-        average_delay = self.get_average_delay(keystrokes, exclude_outliers)
-        std_deviation = self.get_std_deviation(keystrokes, exclude_outliers)
-        highest_keystroke_time = max(
-            self.get_only_times(
-                keystrokes, exclude_outliers))
-        wpm = self.wpm(keystrokes, exclude_outliers)
-        # TODO: Add outlier count
-        # This will be implemented with detailed outlier stats.
-        stats_dict = {
-            "keystroke_count": keystroke_count,
-            "average_delay": average_delay,
-            "std_deviation": std_deviation,
-            "highest_keystroke_time": highest_keystroke_time,
-            "wpm": wpm
-        }
-        return stats_dict
+        stats = DelayStats()
+        errors = ErrorMetrics()
+        if keystrokes is None and km_id is None and self.cache_metrics:
+            # Merge the cached partials instead of reading keystrokes
+            summaries = self.get_log_summaries()
+            keystroke_count = sum(
+                summary.keystroke_count for summary in summaries)
+            for summary in summaries:
+                stats.merge(summary.delays(exclude_outliers))
+                errors.merge(summary.errors)
+        else:
+            if keystrokes is None:
+                keystroke_lists = self.get_keystroke_lists(km_id)
+            else:
+                keystroke_lists = [keystrokes]
+            keystroke_count = sum(len(keystroke_list)
+                                  for keystroke_list in keystroke_lists)
+            for keystroke_list in keystroke_lists:
+                stats.add_keystrokes(keystroke_list, exclude_outliers,
+                                     errors if include_errors else None)
+        if keystroke_count == 0:
+            logging.warning("No keystrokes found.")
+            return None
+        if not include_errors:
+            return stats.format_stats(keystroke_count)
+        return {**stats.format_stats(keystroke_count),
+                **errors.format_stats(exclude_outliers)}
+
+    def get_error_metrics(self,
+                          keystrokes: KeystrokeList | None = None,
+                          km_id: str | None = None) -> ErrorMetrics:
+        """Client facing.
+        Get the mergeable error-correction counts of a log, or of every log.
+
+        Args:
+            `keystrokes` (`KeystrokeList`, optional): Takes priority over km_id.
+            `km_id` (`str`, optional): The UUID or exact string to check for.
+
+        Returns:
+            `ErrorMetrics`: Backspaces, deleted characters and typing time.
+        """
+        errors = ErrorMetrics()
+        if keystrokes is None and km_id is None and self.cache_metrics:
+            for summary in self.get_log_summaries():
+                errors.merge(summary.errors)
+            return errors
+        keystroke_lists = [keystrokes] if keystrokes is not None \
+            else self.get_keystroke_lists(km_id)
+        for keystroke_list in keystroke_lists:
+            errors.add_keystrokes(keystroke_list)
+        return errors
 
     def __repr__(self) -> str:
         pretty_string = (
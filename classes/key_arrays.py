@@ -0,0 +1,180 @@
+# KeyMaster imports
+from utils.constants import SPECIAL_KEY_DISPLAY_NAMES
+from utils.settings import ROUND_DIGITS, OUTLIER_CUTOFF
+from utils.validation import Log
+
+# Third party imports
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+
+class KeyArrays:
+    """
+    A columnar, NumPy-backed view of a log set for vectorized analysis.
+
+    The logs are converted once. Every metric is then computed with array
+    operations instead of a loop over Keystroke objects, and matches the
+    corresponding KeyParser method.
+
+    Attributes:
+    ----------
+    - ids (`list[str]`): The id of each log.
+    - delays (`np.ndarray`): Float delay of every keystroke. NaN for None times.
+    - codes (`np.ndarray`): Index into `keys` of every keystroke. -1 if the key is not legal.
+    - keys (`list[str]`): The display name of each key code, as used by map_chars_to_times.
+    - offsets (`np.ndarray`): Log boundaries. Log i spans offsets[i]:offsets[i + 1].
+    """
+
+    def __init__(self, logs: list[Log]) -> None:
+        if np is None:
+            raise ImportError("NumPy is required for KeyArrays.")
+        self.ids = [log['id'] for log in logs]
+        self.keys: list[str] = []
+        key_codes: dict[str, int] = {}
+        delays: list[float] = []
+        codes: list[int] = []
+        offsets = [0]
+        nan = float('nan')
+        for log in logs:
+            for keystroke in log['keystrokes']:
+                time = keystroke.time
+                delays.append(nan if time is None else time)
+                legal_key = keystroke.legal_key
+                if legal_key is None:
+                    codes.append(-1)
+                    continue
+                key = legal_key.key
+                if legal_key.is_special:
+                    key = SPECIAL_KEY_DISPLAY_NAMES.get(key, key)
+                code = key_codes.get(key)
+                if code is None:
+                    code = key_codes[key] = len(self.keys)
+                    self.keys.append(key)
+                codes.append(code)
+            offsets.append(len(delays))
+        self.delays = np.array(delays, dtype=np.float64)
+        self.codes = np.array(codes, dtype=np.int32)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.delays)
+
+    def span(self, log_index: int | None = None) -> slice:
+        """
+        The keystroke range of one log, or of every log.
+        """
+        if log_index is None:
+            return slice(0, len(self.delays))
+        return slice(int(self.offsets[log_index]),
+                     int(self.offsets[log_index + 1]))
+
+    def mask(self, exclude_outliers: bool = True) -> 'np.ndarray':
+        """
+        True for every keystroke with a usable delay.
+        """
+        mask = ~np.isnan(self.delays)
+        if exclude_outliers:
+            # NaN compares False, so it stays masked out
+            mask &= ~(self.delays > OUTLIER_CUTOFF)
+        return mask
+
+    def outlier_mask(self) -> 'np.ndarray':
+        return self.delays > OUTLIER_CUTOFF
+
+    def get_only_times(self, exclude_outliers: bool = True,
+                       log_index: int | None = None) -> 'np.ndarray':
+        """
+        The delays that KeyParser.get_only_times would return, as an array.
+        """
+        span = self.span(log_index)
+        delays = self.delays[span]
+        return delays[self.mask(exclude_outliers)[span]]
+
+    def wpm(self, exclude_outliers: bool = True,
+            log_index: int | None = None) -> float | None:
+        times = self.get_only_times(exclude_outliers, log_index)
+        total_seconds = float(times.sum())
+        if len(times) == 0 or total_seconds == 0:
+            return None
+        cpm = (len(times) / total_seconds) * 60
+        return round(cpm / 5, 1)
+
+    def get_average_delay(self, exclude_outliers: bool = True,
+                          log_index: int | None = None) -> float | None:
+        times = self.get_only_times(exclude_outliers, log_index)
+        if len(times) == 0:
+            return None
+        return round(float(times.mean()), 4)
+
+    def get_std_deviation(self, exclude_outliers: bool = True,
+                          log_index: int | None = None) -> float | None:
+        times = self.get_only_times(exclude_outliers, log_index)
+        if len(times) < 2:
+            return None
+        return round(float(times.std(ddof=1)), ROUND_DIGITS)
+
+    def log_aggregates(self, exclude_outliers: bool = True
+                       ) -> tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+        """
+        Per-log count, sum and max of the usable delays.
+        The max is -inf for logs without any usable delay.
+        """
+        log_count = len(self.ids)
+        mask = self.mask(exclude_outliers)
+        log_of = np.repeat(np.arange(log_count), np.diff(self.offsets))[mask]
+        delays = self.delays[mask]
+        counts = np.bincount(log_of, minlength=log_count)
+        sums = np.bincount(log_of, weights=delays, minlength=log_count)
+        maxes = np.full(log_count, -np.inf)
+        np.maximum.at(maxes, log_of, delays)
+        return counts, sums, maxes
+
+    def get_highest_keystroke_times(
+            self, exclude_outliers: bool = True) -> list[tuple[str, float]]:
+        counts, _, maxes = self.log_aggregates(exclude_outliers)
+        return [(self.ids[i], float(maxes[i]))
+                for i in np.flatnonzero(counts)]
+
+    def map_chars_to_times(self,
+                           exclude_outliers: bool = True,
+                           log_index: int | None = None) -> dict[str, float]:
+        """
+        Average delay per key, ordered by first appearance like KeyParser.map_chars_to_times.
+        """
+        span = self.span(log_index)
+        mask = self.mask(exclude_outliers)[span]
+        codes = self.codes[span]
+        mask &= codes >= 0
+        codes = codes[mask]
+        if len(codes) == 0:
+            return {}
+        delays = self.delays[span][mask]
+        sums = np.bincount(codes, weights=delays, minlength=len(self.keys))
+        counts = np.bincount(codes, minlength=len(self.keys))
+        present, first_seen = np.unique(codes, return_index=True)
+        ordered = present[np.argsort(first_seen)]
+        return {self.keys[code]: float(sums[code] / counts[code])
+                for code in ordered}
+
+    def get_stats(self, exclude_outliers: bool = True,
+                  log_index: int | None = None) -> dict[str, int | float | None] | None:
+        """
+        The statistics of KeyParser.get_stats(include_errors=False), for one log or every log.
+        The error-correction keys (backspace_count, net_wpm, ...) are not included, since they
+        depend on decoding the keystrokes in order. Use KeyParser.get_stats for those.
+        """
+        span = self.span(log_index)
+        keystroke_count = span.stop - span.start
+        if keystroke_count == 0:
+            return None
+        times = self.get_only_times(exclude_outliers, log_index)
+        return {
+            "keystroke_count": keystroke_count,
+            "average_delay": self.get_average_delay(exclude_outliers, log_index),
+            "std_deviation": self.get_std_deviation(exclude_outliers, log_index),
+            "highest_keystroke_time": float(times.max()) if len(times) else None,
+            "wpm": self.wpm(exclude_outliers, log_index),
+            "outlier_count": int(np.count_nonzero(self.outlier_mask()[span]))
+        }
@@ -9,12 +9,12 @@ from utils.settings import (
     DEFAULT_LISTENER_DURATION,
     MAX_LOGGABLE_DELAY,
     COLLECT_ONLY_TYPEABLE)
-from utils.validation import Keystroke, KeystrokeList, Log, KeystrokeDecoder, KeystrokeEncoder
+from utils.validation import Keystroke, KeystrokeList, Log, KeystrokeDecoder, dump_logs
+from utils.schema import LEGACY_SCHEMA_VERSION, SCHEMA_KEY, SCHEMA_VERSION, is_schema_header, make_schema_header
 from utils.helpers import get_filepath, is_key_valid, resolve_filename, get_log_id, update_log_id
 from utils.constants import APOSTROPHE, KEYBOARD_CHARS
 
 # Standard library imports
-from json import dump as json_dump
 from json import load as json_load
 from time import time, perf_counter
 from uuid import uuid4
@@ -66,6 +66,12 @@ class KeyLogger:
 
         self.banned_keys = banned_keys
 
+        # Running validation state, updated as each keypress is logged
+        self.decoded_chars: list[str] = []
+        self.none_count = 0
+        self.matched_length = 0
+        self.divergence_reported = False
+
         self.is_reset = True
 
     def reset(self) -> None:
@@ -76,8 +82,61 @@ class KeyLogger:
         self.word_count = 0
         self.typed_string = ""
         self.prev_time = time()
+        self.reset_validation_state()
         self.is_reset = True
 
+    def reset_validation_state(self) -> None:
+        """Not client facing.
+        Clear the running validation state.
+        """
+        self.decoded_chars = []
+        self.none_count = 0
+        self.matched_length = 0
+        self.divergence_reported = False
+
+    def track_keystroke(self, keystroke: Keystroke) -> None:
+        """Not client facing.
+        Update the running validation state with a newly logged keystroke.
+        This keeps create_log and save_log O(1) regardless of session length.
+        """
+        if keystroke.time is None:
+            self.none_count += 1
+        decoded_chars = self.decoded_chars
+        keystroke.apply_to(decoded_chars)
+        typed_string = self.typed_string
+        # Both strings only change at the end, so the shared prefix survives
+        limit = min(len(decoded_chars), len(typed_string))
+        matched = min(self.matched_length, limit)
+        while matched < limit and decoded_chars[matched] == typed_string[matched]:
+            matched += 1
+        self.matched_length = matched
+        if self.divergence_reported is False and self.mismatch_index is not None:
+            logging.warning(
+                f"Keystrokes diverged from typed string at index {matched}.")
+            self.divergence_reported = True
+
+    def rebuild_validation_state(self) -> None:
+        """Not client facing.
+        Recompute the running validation state from the internal keystrokes.
+        """
+        self.reset_validation_state()
+        # The typed string is already complete, so skip divergence warnings
+        self.divergence_reported = True
+        for keystroke in self.keystrokes:
+            self.track_keystroke(keystroke)
+        self.divergence_reported = self.mismatch_index is not None
+
+    @property
+    def mismatch_index(self) -> int | None:
+        """Client facing.
+        The first index where the decoded keystrokes and the typed string differ.
+        None if they match.
+        """
+        if self.matched_length == len(
+                self.decoded_chars) == len(self.typed_string):
+            return None
+        return self.matched_length
+
     def set_filename(self, filename: str) -> None:
         """Client facing.
         Set the filename to save logs to.
@@ -171,6 +230,7 @@ class KeyLogger:
         else:
             keystroke = Keystroke(encoded_key, delay)
         self.keystrokes.append(keystroke)
+        self.track_keystroke(keystroke)
         return
 
     # on_press still needs to be tidied up a bit
@@ -262,7 +322,8 @@ class KeyLogger:
             input_string: str | None = None) -> bool:
         """Not client facing (This function might need revisiting)
         Checks the validity of a list of keystrokes and a string. If valid, it can be logged in a Log object.
-        By default, this function checks the internal keystrokes and input_string attributes.
+        By default, this function checks the internal keystrokes and input_string attributes,
+        using the validation state kept up to date by track_keystroke.
 
         Args:
                 `keystrokes` (`KeystrokeList`): The list of keystrokes to validate.
@@ -271,6 +332,8 @@ class KeyLogger:
         Returns:
                 `bool`: True if the decomposed keystrokes match the input string. False otherwise.
         """
+        if keystrokes is None and input_string is None:
+            return self.is_internal_log_loggable()
         if keystrokes is None:
             keystrokes = self.keystrokes
         if input_string is None:
@@ -295,6 +358,25 @@ class KeyLogger:
         # so string should be adjusted before using as an argument here
         return success
 
+    def is_internal_log_loggable(self) -> bool:
+        """Not client facing.
+        O(1) version of is_loggable for the internal keystrokes and typed string.
+        """
+        if self.keystrokes.is_empty():
+            logging.error("No keystrokes found. Log not legit")
+            return False
+        if self.none_count > 1:
+            logging.error(
+                'None value marks first character ONLY! Log not legit.')
+            return False
+        mismatch_index = self.mismatch_index
+        success = mismatch_index is None
+        if not success:
+            logging.warning(
+                f"String does not align with keystroke list at index {mismatch_index}.")
+        logging.info(f"{len(self.keystrokes)} Keystrokes validated: {success}")
+        return success
+
     def set_internal_log(
             self,
             keystrokes: KeystrokeList,
@@ -315,6 +397,7 @@ class KeyLogger:
         self.keystrokes = keystrokes
         self.typed_string = input_string
         self.word_count = input_string.count(' ')
+        self.rebuild_validation_state()
         return True
 
     def create_log(self, log_id: str | None = None) -> Log | None:
@@ -371,20 +454,24 @@ class KeyLogger:
         if not log:
             logging.error("Log had trouble saving!")
             return False
+        # Shift presses are only valid in the legacy format, which drops them on load
+        schema_version = LEGACY_SCHEMA_VERSION if LOG_SHIFT_PRESSES else SCHEMA_VERSION
         # Create var logs to store the logs
-        # Replace keystrokes in json using KeystrokeEncoder
+        # Stream keystrokes to the file using KeystrokeEncoder
         # Append the log object to the file
         try:
             with open(filepath, 'r+') as f:
                 # I can use the KeystrokeDecoder here, but it seems unnecessary
                 logs: list[Log] = json_load(f)
+                if logs and is_schema_header(logs[0]) and logs[0][SCHEMA_KEY] > schema_version:
+                    logs[0] = make_schema_header(schema_version)
                 logs.append(log)
                 f.seek(0)
-                json_dump(logs, f, cls=KeystrokeEncoder)
+                dump_logs(logs, f)
                 logging.info("Logfile updated.")
         except FileNotFoundError:
             with open(filepath, 'w') as f:
-                json_dump([log], f, cls=KeystrokeEncoder)
+                dump_logs([make_schema_header(schema_version), log], f)
         except Exception as e:
             logging.error(f"An error occurred: {e}")
             return False
@@ -0,0 +1,170 @@
+# KeyMaster imports
+from utils.helpers import get_filepath
+from utils.schema import split_schema_header
+from utils.validation import KeystrokeDecoder, KeystrokeList
+
+# Standard library imports
+from concurrent.futures import ProcessPoolExecutor
+from json import load as json_load
+from typing import Any, TypedDict
+import logging
+logging.basicConfig(encoding='utf-8', level=logging.INFO)
+
+# Logs per worker task. Small enough to balance, big enough to amortize pickling.
+VALIDATION_CHUNK_SIZE = 500
+
+# Failure reasons
+CORRUPT = "corrupt"
+EMPTY = "empty"
+EXTRA_NULL_TIME = "extra_null_time"
+INVALID_KEY = "invalid_key"
+STRING_MISMATCH = "string_mismatch"
+
+
+class LogFailure(TypedDict):
+    """
+    A log that failed validation. Reasons are one of the codes above,
+    with a human readable detail for each.
+    """
+    index: int
+    id: str | None
+    reasons: list[str]
+    details: list[str]
+
+
+class ValidationReport(TypedDict):
+    """
+    The machine-readable result of validating a whole logfile.
+    """
+    filename: str
+    total: int
+    passed: int
+    failed: list[LogFailure]
+
+
+def validate_raw_log(index: int, raw_log: Any) -> LogFailure | None:
+    """
+    Validate a single undecoded log entry from a logfile.
+    Runs the same checks as KeyLogger.is_loggable and KeystrokeList.validate.
+
+    Returns:
+        `LogFailure` or `None`: None if the log passed every check.
+    """
+    reasons: list[str] = []
+    details: list[str] = []
+    log_id = None
+    if isinstance(raw_log, dict) and isinstance(raw_log.get('id'), str):
+        log_id = raw_log['id']
+    try:
+        log = KeystrokeDecoder().object_hook(raw_log)
+        if not isinstance(log.get('string'), str) or not isinstance(
+                log.get('keystrokes'), KeystrokeList):
+            raise ValueError("Missing id, string, or keystrokes.")
+    except Exception as e:
+        return {
+            'index': index,
+            'id': log_id,
+            'reasons': [CORRUPT],
+            'details': [str(e)]}
+
+    keystrokes: KeystrokeList = log['keystrokes']
+    if keystrokes.is_empty():
+        reasons.append(EMPTY)
+        details.append("No keystrokes found.")
+    else:
+        none_count = 0
+        invalid_keys = []
+        for keystroke in keystrokes:
+            if keystroke.time is None:
+                none_count += 1
+            if not keystroke.valid:
+                invalid_keys.append(keystroke.key)
+        if none_count > 1:
+            reasons.append(EXTRA_NULL_TIME)
+            details.append(f"{none_count} keystrokes have a None time.")
+        if invalid_keys:
+            reasons.append(INVALID_KEY)
+            details.append(f"Invalid keys: {invalid_keys[:10]}")
+        if not keystrokes.validate(log['string']):
+            reasons.append(STRING_MISMATCH)
+            details.append("String does not align with keystroke list.")
+    if not reasons:
+        return None
+    return {
+        'index': index,
+        'id': log_id,
+        'reasons': reasons,
+        'details': details}
+
+
+def validate_raw_chunk(start: int, raw_logs: list[Any]) -> list[LogFailure]:
+    """
+    Validate a shard of undecoded logs. Runs inside a worker process.
+    """
+    failures = []
+    for offset, raw_log in enumerate(raw_logs):
+        failure = validate_raw_log(start + offset, raw_log)
+        if failure is not None:
+            failures.append(failure)
+    return failures
+
+
+def validate_logs(raw_logs: list[Any],
+                  max_workers: int | None = None,
+                  chunk_size: int = VALIDATION_CHUNK_SIZE) -> list[LogFailure]:
+    """
+    Validate undecoded logs, sharding them across a process pool.
+
+    Args:
+        `raw_logs` (`list`): The logs as loaded by json without a decoder.
+        `max_workers` (`int`, optional): Worker processes. 1 validates serially.
+        `chunk_size` (`int`): The number of logs per worker task.
+
+    Returns:
+        `list[LogFailure]`: The failing logs, in logfile order.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    starts = range(0, len(raw_logs), chunk_size)
+    if max_workers == 1 or len(raw_logs) <= chunk_size:
+        return validate_raw_chunk(0, raw_logs)
+    failures: list[LogFailure] = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(validate_raw_chunk, start,
+                                   raw_logs[start:start + chunk_size]) for start in starts]
+        for future in futures:
+            failures.extend(future.result())
+    return failures
+
+
+def validate_logfile(filename: str,
+                     max_workers: int | None = None,
+                     chunk_size: int = VALIDATION_CHUNK_SIZE) -> ValidationReport:
+    """
+    Check an entire logfile for corrupt entries, stray None delays,
+    invalid keys and string/keystroke mismatches.
+
+    Args:
+        `filename` (`str`): The logfile. Use 'REG' or 'SIM' for main logfiles.
+        `max_workers` (`int`, optional): Worker processes. Defaults to the CPU count.
+        `chunk_size` (`int`): The number of logs per worker task.
+
+    Returns:
+        `ValidationReport`: A report of every failing log id and the reasons.
+    """
+    filepath = get_filepath(filename)
+    if filepath is None:
+        raise ValueError("No filepath found.")
+    with open(filepath, 'r') as f:
+        entries = json_load(f)
+    if not isinstance(entries, list):
+        raise ValueError("Logfile must contain a list of logs.")
+    _, raw_logs = split_schema_header(entries)
+    failures = validate_logs(raw_logs, max_workers, chunk_size)
+    total = len(raw_logs)
+    logging.info(f"Validated {total} logs. {len(failures)} failed.")
+    return {
+        'filename': filepath,
+        'total': total,
+        'passed': total - len(failures),
+        'failed': failures}
@@ -0,0 +1,118 @@
+# KeyMaster imports
+from utils.metrics import LogSummary
+from utils.settings import OUTLIER_CUTOFF, METRIC_CACHE_SUFFIX
+from utils.validation import Log
+
+# Standard library imports
+from json import dump as json_dump, load as json_load
+from os import path, replace
+import logging
+logging.basicConfig(encoding='utf-8', level=logging.INFO)
+
+# Bump when the LogSummary format changes to discard old caches
+METRIC_CACHE_VERSION = 5
+
+
+def get_metric_cache_path(filepath: str | None) -> str | None:
+    """
+    The metric cache is stored next to its logfile.
+    """
+    if filepath is None:
+        return None
+    return filepath + METRIC_CACHE_SUFFIX
+
+
+class MetricCache:
+    """
+    A persistent cache of per-log summaries, keyed by content digest.
+    A summary only depends on the keystrokes, so logs sharing an id or content never collide.
+
+    Attributes:
+    ----------
+    - filepath (`str` | `None`): The cache file. None keeps the cache in memory only.
+    - entries (`dict[str, LogSummary]`): Log digest to summary.
+    - hits (`int`): Summaries served from the cache since loading.
+    - misses (`int`): Summaries computed since loading.
+    """
+
+    def __init__(self, filepath: str | None = None) -> None:
+        self.filepath = filepath
+        self.entries: dict[str, LogSummary] = {}
+        self.modified = False
+        self.hits = 0
+        self.misses = 0
+        if filepath is not None:
+            self.load()
+
+    def load(self) -> None:
+        """
+        Read the cache file. A missing, stale or corrupt cache is treated as empty.
+        """
+        self.entries = {}
+        self.modified = False
+        if self.filepath is None or not path.exists(self.filepath):
+            return
+        try:
+            with open(self.filepath, 'r') as f:
+                data = json_load(f)
+            if data.get("cache_version") != METRIC_CACHE_VERSION or \
+                    data.get("outlier_cutoff") != OUTLIER_CUTOFF:
+                logging.info("Metric cache is outdated. Rebuilding.")
+                return
+            self.entries = {digest: LogSummary.from_dict(summary)
+                            for digest, summary in data["logs"].items()}
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable metric cache: {e}")
+            self.entries = {}
+
+    def save(self) -> None:
+        """
+        Write the cache file if it changed, replacing it atomically.
+        """
+        if self.filepath is None or not self.modified:
+            return
+        temp_path = self.filepath + '.tmp'
+        data = {
+            "cache_version": METRIC_CACHE_VERSION,
+            "outlier_cutoff": OUTLIER_CUTOFF,
+            "logs": {digest: summary.to_dict()
+                     for digest, summary in self.entries.items()}}
+        try:
+            with open(temp_path, 'w') as f:
+                json_dump(data, f)
+            replace(temp_path, self.filepath)
+            self.modified = False
+        except OSError as e:
+            logging.warning(f"Unable to save metric cache: {e}")
+
+    def get_summaries(self, logs: list[Log],
+                      digests: list[str]) -> list[LogSummary]:
+        """
+        Get the summary of each log, only summarizing logs that are new or changed.
+        Entries for logs that are gone are dropped.
+
+        Args:
+            `logs` (`list[Log]`): The logs.
+            `digests` (`list[str]`): The content digest of each log, as from log_digest.
+
+        Returns:
+            `list[LogSummary]`: A summary per log, in the same order.
+        """
+        if len(logs) != len(digests):
+            raise ValueError("Every log needs a digest.")
+        summaries: list[LogSummary] = []
+        entries: dict[str, LogSummary] = {}
+        for log, digest in zip(logs, digests):
+            summary = entries.get(digest) or self.entries.get(digest)
+            if summary is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                summary = LogSummary.from_keystrokes(log['keystrokes'])
+                self.modified = True
+            entries[digest] = summary
+            summaries.append(summary)
+        if len(entries) != len(self.entries):
+            self.modified = True
+        self.entries = entries
+        return summaries
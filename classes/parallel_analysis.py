@@ -0,0 +1,160 @@
+# KeyMaster imports
+from utils.helpers import get_filepath
+from utils.metrics import LogSummary, merge_key_times
+from utils.schema import iter_raw_entries, is_schema_header
+from utils.settings import DEFAULT_EXCLUDE_OUTLIERS, LOG_DIR
+from utils.validation import KeystrokeDecoder, KeystrokeList
+
+# Standard library imports
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from glob import glob, has_magic
+from os import cpu_count, path
+from typing import Any, Iterator, TypedDict
+import logging
+logging.basicConfig(encoding='utf-8', level=logging.INFO)
+
+# Logs per worker task. Small enough to balance, big enough to amortize pickling.
+ANALYSIS_CHUNK_SIZE = 500
+
+
+class AnalysisResult(TypedDict):
+    """
+    The merged result of analyzing several logfiles.
+    `stats` and `character_times` match KeyParser.get_stats and KeyParser.map_chars_to_times.
+    """
+    filepaths: list[str]
+    log_count: int
+    skipped_count: int
+    stats: dict[str, int | float | None] | None
+    character_times: dict[str, float]
+
+
+def resolve_logfiles(filenames: str | list[str]) -> list[str]:
+    """
+    Expand logfile names and glob patterns into absolute filepaths, without duplicates.
+    Relative patterns are matched in LOG_DIR. 'REG' and 'SIM' return default logfiles.
+    """
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    filepaths: list[str] = []
+    for filename in filenames:
+        if has_magic(filename):
+            pattern = filename if path.isabs(filename) else path.join(LOG_DIR, filename)
+            matches = sorted(glob(pattern))
+            if not matches:
+                logging.warning(f"No logfiles match {filename}.")
+        else:
+            filepath = get_filepath(filename)
+            matches = [filepath] if filepath is not None else []
+        for filepath in matches:
+            if filepath not in filepaths:
+                filepaths.append(filepath)
+    return filepaths
+
+
+def summarize_raw_chunk(raw_logs: list[Any]) -> tuple[LogSummary, int, int]:
+    """
+    Decode a segment of raw logs and merge their summaries. Runs inside a worker process.
+
+    Returns:
+        `tuple[LogSummary, int, int]`: The merged summary, the logs summarized and the logs skipped.
+    """
+    decoder = KeystrokeDecoder()
+    summary = LogSummary()
+    log_count = 0
+    skipped_count = 0
+    for raw_log in raw_logs:
+        try:
+            log = decoder.object_hook(raw_log)
+            keystrokes = log['keystrokes']
+            if not isinstance(keystrokes, KeystrokeList):
+                raise ValueError("Missing keystrokes.")
+        except Exception:
+            skipped_count += 1
+            continue
+        summary.merge(LogSummary.from_keystrokes(keystrokes))
+        log_count += 1
+    return summary, log_count, skipped_count
+
+
+def iter_raw_chunks(filepaths: list[str],
+                    chunk_size: int = ANALYSIS_CHUNK_SIZE) -> Iterator[list[Any]]:
+    """
+    Stream the logs of every logfile as segments of at most `chunk_size` raw logs.
+    """
+    for filepath in filepaths:
+        chunk: list[Any] = []
+        try:
+            with open(filepath, 'r') as f:
+                for entry in iter_raw_entries(f):
+                    if is_schema_header(entry):
+                        continue
+                    chunk.append(entry)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+        except (OSError, ValueError) as e:
+            logging.error(f"Unable to read {filepath}: {e}")
+        if chunk:
+            yield chunk
+
+
+def analyze_logfiles(filenames: str | list[str],
+                     exclude_outliers: bool = DEFAULT_EXCLUDE_OUTLIERS,
+                     max_workers: int | None = None,
+                     chunk_size: int = ANALYSIS_CHUNK_SIZE) -> AnalysisResult:
+    """
+    Analyze many logfiles at once, decoding and summarizing segments in a process pool.
+
+    Segments are read lazily and at most two per worker are in flight, so memory
+    stays bounded. Partial results are merged in file order, so the result
+    does not depend on scheduling.
+
+    Args:
+        `filenames` (`str` | `list[str]`): Logfiles or glob patterns. Use 'REG' or 'SIM' for main logfiles.
+        `exclude_outliers` (`bool`): A flag indicating whether to exclude outliers.
+        `max_workers` (`int`, optional): Worker processes. 1 analyzes serially.
+        `chunk_size` (`int`): The number of logs per worker task.
+
+    Returns:
+        `AnalysisResult`: The merged statistics and character times.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    filepaths = resolve_logfiles(filenames)
+    summary = LogSummary()
+    log_count = 0
+    skipped_count = 0
+
+    def merge(result: tuple[LogSummary, int, int]) -> None:
+        nonlocal log_count, skipped_count
+        summary.merge(result[0])
+        log_count += result[1]
+        skipped_count += result[2]
+
+    chunks = iter_raw_chunks(filepaths, chunk_size)
+    if max_workers == 1:
+        for chunk in chunks:
+            merge(summarize_raw_chunk(chunk))
+    else:
+        max_in_flight = 2 * (max_workers or cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending: deque[Future] = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(summarize_raw_chunk, chunk))
+                if len(pending) >= max_in_flight:
+                    merge(pending.popleft().result())
+            while pending:
+                merge(pending.popleft().result())
+
+    if skipped_count:
+        logging.warning(f"Skipped {skipped_count} unreadable logs.")
+    logging.info(f"Analyzed {log_count} logs from {len(filepaths)} logfiles.")
+    return {
+        'filepaths': filepaths,
+        'log_count': log_count,
+        'skipped_count': skipped_count,
+        'stats': summary.format_stats(exclude_outliers)
+        if summary.keystroke_count else None,
+        'character_times': merge_key_times([summary], exclude_outliers)}
@@ -0,0 +1,183 @@
+# KeyMaster imports
+from classes.features import FeatureMatrix
+from utils.settings import SIMILARITY_IVF_THRESHOLD, SIMILARITY_PROBES
+
+# Standard library imports
+from typing import TypedDict
+
+# Third party imports
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+# Rows per block when assigning rows to clusters, to bound memory
+ASSIGN_BLOCK_SIZE = 8192
+KMEANS_ITERATIONS = 10
+# Rows sampled per cluster to train the coarse quantizer
+KMEANS_SAMPLES_PER_CLUSTER = 64
+
+
+class Neighbor(TypedDict):
+    """
+    A log close to the query, by Euclidean distance between standardized feature vectors.
+    """
+    index: int
+    id: str
+    distance: float
+
+
+def squared_distances(rows: 'np.ndarray', row_norms: 'np.ndarray',
+                      vectors: 'np.ndarray') -> 'np.ndarray':
+    """
+    Squared Euclidean distance from every row to every vector, as a (rows, vectors) matrix.
+    """
+    distances = row_norms[:, None] - 2 * rows @ vectors.T + \
+        np.einsum('ij,ij->i', vectors, vectors)[None, :]
+    return np.maximum(distances, 0.0)
+
+
+def nearest_centroids(rows: 'np.ndarray', centroids: 'np.ndarray') -> 'np.ndarray':
+    row_norms = np.einsum('ij,ij->i', rows, rows)
+    assignments = np.empty(len(rows), dtype=np.int64)
+    for start in range(0, len(rows), ASSIGN_BLOCK_SIZE):
+        block = slice(start, start + ASSIGN_BLOCK_SIZE)
+        assignments[block] = squared_distances(
+            rows[block], row_norms[block], centroids).argmin(axis=1)
+    return assignments
+
+
+def kmeans(rows: 'np.ndarray', cluster_count: int, seed: int = 0) -> 'np.ndarray':
+    """
+    Lloyd's algorithm on a sample of the rows. Returns the centroids.
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(rows), cluster_count * KMEANS_SAMPLES_PER_CLUSTER)
+    sample = rows[rng.choice(len(rows), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, cluster_count, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = nearest_centroids(sample, centroids)
+        counts = np.bincount(assignments, minlength=cluster_count)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        filled = counts > 0
+        # Empty clusters keep their centroid
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbor search over the rows of a FeatureMatrix.
+
+    Features are standardized to zero mean and unit variance, and missing
+    features are set to the mean, so every feature weighs the same. Exact
+    search computes every distance in one matrix product. The approximate
+    index (IVF) clusters the rows with k-means and only searches the clusters
+    nearest to the query.
+
+    Attributes:
+    ----------
+    - features (`FeatureMatrix`): The indexed feature vectors.
+    - rows (`np.ndarray`): The standardized feature vectors.
+    - centroids (`np.ndarray` | `None`): Cluster centroids. None without an approximate index.
+    - lists (`list[np.ndarray]`): The rows of each cluster.
+    """
+
+    def __init__(self, features: FeatureMatrix,
+                 cluster_count: int | None = None) -> None:
+        if np is None:
+            raise ImportError("NumPy is required for SimilarityIndex.")
+        self.features = features
+        matrix = features.matrix
+        finite = np.isfinite(matrix)
+        counts = np.maximum(finite.sum(axis=0), 1)
+        values = np.where(finite, matrix, 0.0)
+        self.mean = values.sum(axis=0) / counts
+        variances = (np.where(finite, matrix - self.mean, 0.0) ** 2).sum(axis=0) / counts
+        scale = np.sqrt(variances)
+        self.scale = np.where(scale > 0, scale, 1.0)
+        self.rows = self.standardize(matrix)
+        self.row_norms = np.einsum('ij,ij->i', self.rows, self.rows)
+        self.centroids: 'np.ndarray | None' = None
+        self.lists: list['np.ndarray'] = []
+        if cluster_count is None and len(self.rows) >= SIMILARITY_IVF_THRESHOLD:
+            cluster_count = int(np.sqrt(len(self.rows)))
+        if cluster_count:
+            self.build_clusters(cluster_count)
+
+    def standardize(self, matrix: 'np.ndarray') -> 'np.ndarray':
+        rows = (matrix - self.mean) / self.scale
+        return np.where(np.isfinite(rows), rows, 0.0)
+
+    def build_clusters(self, cluster_count: int) -> None:
+        """
+        Build the approximate index with `cluster_count` clusters.
+        """
+        if not 1 <= cluster_count <= len(self.rows):
+            raise ValueError("cluster_count must be between 1 and the number of logs.")
+        self.centroids = kmeans(self.rows, cluster_count)
+        assignments = nearest_centroids(self.rows, self.centroids)
+        order = np.argsort(assignments, kind='stable')
+        bounds = np.searchsorted(assignments[order], np.arange(cluster_count + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(cluster_count)]
+
+    def search(self, vector: 'np.ndarray', k: int = 5,
+               approximate: bool | None = None,
+               probes: int = SIMILARITY_PROBES,
+               exclude: int | None = None) -> list[Neighbor]:
+        """
+        Find the k rows nearest to a feature vector.
+
+        Args:
+            `vector` (`np.ndarray`): Unstandardized features, in the schema's column order.
+            `k` (`int`): The number of neighbors.
+            `approximate` (`bool`, optional): Search only the nearest clusters.
+            Defaults to True when the approximate index exists.
+            `probes` (`int`): Clusters searched by an approximate search.
+            `exclude` (`int`, optional): A row to leave out, like the query's own log.
+
+        Returns:
+            `list[Neighbor]`: The nearest logs, closest first.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1.")
+        if approximate is None:
+            approximate = self.centroids is not None
+        if approximate and self.centroids is None:
+            raise ValueError("No approximate index. Call build_clusters first.")
+        query = self.standardize(np.asarray(vector, dtype=np.float64)[None, :])
+        if approximate:
+            centroid_distances = squared_distances(
+                self.centroids, np.einsum('ij,ij->i', self.centroids, self.centroids),
+                query)[:, 0]
+            nearest = np.argsort(centroid_distances)[:probes]
+            candidates = np.concatenate([self.lists[i] for i in nearest])
+            if exclude is not None:
+                candidates = candidates[candidates != exclude]
+            distances = squared_distances(self.rows[candidates],
+                                          self.row_norms[candidates], query)[:, 0]
+        else:
+            # Every row is a candidate, so skip the copy
+            candidates = np.arange(len(self.rows))
+            distances = squared_distances(self.rows, self.row_norms, query)[:, 0]
+            if exclude is not None:
+                candidates = np.delete(candidates, exclude)
+                distances = np.delete(distances, exclude)
+        if len(candidates) == 0:
+            return []
+        if k < len(candidates):
+            top = np.argpartition(distances, k)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.lexsort((candidates[top], distances[top]))]
+        return [{'index': int(candidates[i]),
+                 'id': self.features.ids[candidates[i]],
+                 'distance': float(np.sqrt(distances[i]))} for i in top]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __repr__(self) -> str:
+        clusters = 0 if self.centroids is None else len(self.centroids)
+        return f"SimilarityIndex({len(self.rows)} logs, {clusters} clusters)"
@@ -0,0 +1,173 @@
+# KeyMaster imports
+from utils.settings import NGRAM_INDEX_SUFFIX
+
+# Standard library imports
+from hashlib import blake2b
+from json import dump as json_dump, load as json_load
+from os import path, replace
+from typing import TypedDict
+import logging
+logging.basicConfig(encoding='utf-8', level=logging.INFO)
+
+NGRAM_SIZE = 3
+# Bump when the index format changes to discard old indexes
+NGRAM_INDEX_VERSION = 2
+
+
+class SearchHit(TypedDict):
+    """
+    A log whose string contains the keyword, with every (overlapping) match offset.
+    """
+    index: int
+    id: str
+    positions: list[int]
+
+
+def get_ngram_index_path(filepath: str | None) -> str | None:
+    """
+    The n-gram index is stored next to its logfile.
+    """
+    if filepath is None:
+        return None
+    return filepath + NGRAM_INDEX_SUFFIX
+
+
+def combine_digests(digests: list[str]) -> str:
+    """
+    A single digest for a list of log digests, in order.
+    """
+    return blake2b('\n'.join(digests).encode(), digest_size=16).hexdigest()
+
+
+def strings_digest(ids: list[str], strings: list[str]) -> str:
+    """
+    A digest of the ids and strings of the logs, in order. Keystrokes are left out,
+    so editing delays does not invalidate the index.
+    """
+    digest = blake2b(digest_size=16)
+    for km_id, string in zip(ids, strings):
+        digest.update(f"{km_id}\x1f{string}\x1e".encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+def get_ngrams(string: str) -> set[str]:
+    return {string[i:i + NGRAM_SIZE] for i in range(len(string) - NGRAM_SIZE + 1)}
+
+
+def find_positions(string: str, keyword: str) -> list[int]:
+    positions = []
+    position = string.find(keyword)
+    while position != -1:
+        positions.append(position)
+        position = string.find(keyword, position + 1)
+    return positions
+
+
+class NgramIndex:
+    """
+    An inverted index from each trigram to the positions of the logs whose string contains it.
+
+    A search intersects the postings of the keyword's trigrams, starting with the
+    rarest, and then verifies each candidate with str.find. Keywords shorter than
+    a trigram fall back to a scan.
+
+    Attributes:
+    ----------
+    - ids (`list[str]`): The id of each indexed log.
+    - strings (`list[str]`): The string of each indexed log.
+    - digest (`str`): The strings_digest of the indexed logs.
+    - postings (`dict[str, list[int]]`): Trigram to ascending log positions.
+    """
+
+    def __init__(self, ids: list[str], strings: list[str], digest: str,
+                 postings: dict[str, list[int]] | None = None) -> None:
+        self.ids = ids
+        self.strings = strings
+        self.digest = digest
+        if postings is None:
+            postings = {}
+            for position, string in enumerate(strings):
+                for ngram in get_ngrams(string):
+                    postings.setdefault(ngram, []).append(position)
+        self.postings = postings
+
+    @classmethod
+    def load(cls, filepath: str, ids: list[str], strings: list[str],
+             digest: str) -> 'NgramIndex | None':
+        """
+        Read an index file. Returns None if it is missing, corrupt, or indexes other logs.
+        """
+        if not path.exists(filepath):
+            return None
+        try:
+            with open(filepath, 'r') as f:
+                data = json_load(f)
+            if data.get("index_version") != NGRAM_INDEX_VERSION or data.get("digest") != digest:
+                return None
+            return cls(ids, strings, digest, data["postings"])
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable n-gram index: {e}")
+            return None
+
+    def save(self, filepath: str) -> None:
+        """
+        Write the index file, replacing it atomically.
+        """
+        temp_path = filepath + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json_dump({"index_version": NGRAM_INDEX_VERSION,
+                           "digest": self.digest,
+                           "postings": self.postings}, f)
+            replace(temp_path, filepath)
+        except OSError as e:
+            logging.warning(f"Unable to save n-gram index: {e}")
+
+    def candidates(self, keyword: str) -> list[int]:
+        """
+        Positions of the logs that contain every trigram of the keyword.
+        """
+        if len(keyword) < NGRAM_SIZE:
+            return list(range(len(self.strings)))
+        postings = []
+        for ngram in get_ngrams(keyword):
+            posting = self.postings.get(ngram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        return sorted(candidates)
+
+    def search(self, keyword: str, limit: int | None = None,
+               ranked: bool = False) -> list[SearchHit]:
+        """
+        Find every log whose string contains the keyword.
+
+        Args:
+            `keyword` (`str`): The substring to search for.
+            `limit` (`int`, optional): The maximum number of hits.
+            `ranked` (`bool`): Order by number of matches instead of log order.
+
+        Returns:
+            `list[SearchHit]`: The matching logs with the offset of each match.
+        """
+        hits: list[SearchHit] = []
+        for position in self.candidates(keyword):
+            if keyword:
+                positions = find_positions(self.strings[position], keyword)
+            else:
+                positions = [0]
+            if not positions:
+                continue
+            hits.append({'index': position, 'id': self.ids[position],
+                         'positions': positions})
+            if not ranked and limit is not None and len(hits) >= limit:
+                break
+        if ranked:
+            hits.sort(key=lambda hit: (-len(hit['positions']), hit['index']))
+        return hits if limit is None else hits[:limit]
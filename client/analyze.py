@@ -71,6 +71,19 @@ class Analyze:
             raise ValueError("Substring not present in logs.")
         return km_id
 
+    def search_strings(self, substring: str, limit: int | None = None,
+                       ranked: bool = False) -> list[dict]:
+        """
+        Get every log containing a substring, with the offset of each match.
+
+        Parameters
+        ----------
+        - substring (`str`): The substring to search for.
+        - limit (`int`, optional): The maximum number of results.
+        - ranked (`bool`, optional): Order by number of matches instead of log order.
+        """
+        return list(self.parser.search_strings(substring, limit, ranked))
+
     def get_strings(self, km_id: str | None = None) -> list[str]:
         """
         Get the strings from the logs.
@@ -168,6 +181,7 @@ class Analyze:
                   keystrokes: KeystrokeList | None = None,
                   exclude_outliers: bool | None = None,
                   km_id: str | None = None,
+                  include_errors: bool = True,
                   ):
         """
         Get the stats of the logfile or provided keystrokes/km_id.
@@ -177,8 +191,24 @@ class Analyze:
         - keystrokes (`KeystrokeList`, optional): The keystrokes to check.
         - km_id (`str`, optional): The id to check.
         - exclude_outliers (`bool`, optional): Whether to exclude outliers.
+        - include_errors (`bool`): Whether to add backspace and correction metrics.
+        """
+        return self.parser.get_stats(keystrokes, exclude_outliers, km_id, include_errors)
+
+    def compare_keystroke_lists(self, keystroke_lists: list,
+                                exclude_outliers: bool | None = None,
+                                baseline: int = 0) -> dict:
+        """
+        Compare the timing of several keystroke lists or log ids against a baseline.
+
+        Parameters
+        ----------
+        - keystroke_lists (`list`): KeystrokeLists or ids to compare.
+        - exclude_outliers (`bool`, optional): Whether to exclude outliers.
+        - baseline (`int`, optional): The position of the list to compare against.
         """
-        return self.parser.get_stats(keystrokes, exclude_outliers, km_id)
+        return self.parser.compare_keystroke_lists(
+            keystroke_lists, exclude_outliers, baseline)
 
     def visualize(
             self,
@@ -0,0 +1,70 @@
+from json import dump as json_dump
+import sys
+
+from classes.parallel_analysis import analyze_logfiles, ANALYSIS_CHUNK_SIZE
+from utils.settings import DEFAULT_EXCLUDE_OUTLIERS
+
+DEFAULT_LOGFILES = ["REG"]
+
+
+def main(files=DEFAULT_LOGFILES, workers=None, output=None,
+         exclude_outliers=DEFAULT_EXCLUDE_OUTLIERS,
+         chunk_size=ANALYSIS_CHUNK_SIZE) -> int:
+    """
+    Analyze many logfiles in parallel and write a JSON report.
+
+    Parameters
+    ----------
+    - files (`list[str]`): Logfiles or glob patterns to analyze.
+    - workers (`int`, optional): The number of worker processes.
+    - output (`str`, optional): Write the report here instead of stdout.
+    - exclude_outliers (`bool`): Whether to exclude outliers.
+
+    Returns
+    -------
+    - `int`: The exit code. 1 if no logs were analyzed.
+    """
+    result = analyze_logfiles(files, exclude_outliers, workers, chunk_size)
+    if output is None:
+        json_dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        with open(output, "w") as f:
+            json_dump(result, f, indent=2)
+        print(f"Analyzed {result['log_count']} logs. Report: {output}")
+    return 0 if result['log_count'] else 1
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-f",
+        "--files",
+        nargs="+",
+        default=DEFAULT_LOGFILES,
+        help="Logfiles or glob patterns (quote them) to analyze.")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of worker processes.")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Write the JSON report to this file.")
+    parser.add_argument(
+        "--include-outliers",
+        action="store_true",
+        help="Include delays above the outlier cutoff.")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=ANALYSIS_CHUNK_SIZE,
+        help="The number of logs per worker task.")
+
+    args = parser.parse_args()
+    sys.exit(main(args.files, args.workers, args.output,
+                  not args.include_outliers, args.chunk_size))
@@ -0,0 +1,104 @@
+from random import Random
+from string import ascii_lowercase
+from time import perf_counter
+from typing import Any, Callable
+
+from classes.key_analyzer import KeyParser
+from utils.validation import Keystroke, KeystrokeList, Log
+
+DEFAULT_KEYSTROKES = 1_000_000
+DEFAULT_LOG_LENGTH = 200
+SPECIAL_KEYS = ["Key.space", "Key.backspace", "Key.enter"]
+
+
+def generate_logs(keystroke_count=DEFAULT_KEYSTROKES,
+                  log_length=DEFAULT_LOG_LENGTH, seed=0) -> list[Log]:
+    """
+    Generate synthetic logs with realistic delays and a few outliers.
+
+    Parameters
+    ----------
+    - keystroke_count (`int`): The total number of keystrokes.
+    - log_length (`int`): The number of keystrokes per log.
+    - seed (`int`): The random seed.
+
+    Returns
+    -------
+    - `list[Log]`: The generated logs.
+    """
+    rng = Random(seed)
+    logs: list[Log] = []
+    for log_index in range(0, keystroke_count, log_length):
+        keystrokes = KeystrokeList()
+        for i in range(min(log_length, keystroke_count - log_index)):
+            if rng.random() < 0.1:
+                key = rng.choice(SPECIAL_KEYS)
+            else:
+                key = f"'{rng.choice(ascii_lowercase)}'"
+            time = None if i == 0 else round(rng.expovariate(1 / 0.15), 4)
+            if time is not None and rng.random() < 0.002:
+                time += 5.0
+            keystrokes.append(Keystroke(key, time))
+        logs.append({'id': f"B{log_index:07d}", 'string': '',
+                     'keystrokes': keystrokes})
+    return logs
+
+
+def time_call(function: Callable[[], Any]) -> tuple[Any, float]:
+    start = perf_counter()
+    result = function()
+    return result, perf_counter() - start
+
+
+def main(keystrokes=DEFAULT_KEYSTROKES, log_length=DEFAULT_LOG_LENGTH) -> None:
+    """
+    Compare the pure Python KeyParser metrics with the NumPy backend.
+
+    Parameters
+    ----------
+    - keystrokes (`int`): The total number of keystrokes to generate.
+    - log_length (`int`): The number of keystrokes per log.
+    """
+    print(f"Generating {keystrokes} keystrokes...")
+    parser = KeyParser(None, preload=False, cache_metrics=False)
+    parser.logs = generate_logs(keystrokes, log_length)
+    arrays, build_seconds = time_call(parser.get_key_arrays)
+    print(f"Built arrays in {build_seconds:.3f}s")
+
+    cases: list[tuple[str, Callable[[], Any], Callable[[], Any]]] = [
+        ("get_stats", lambda: parser.get_stats(include_errors=False), arrays.get_stats),
+        ("get_highest_keystroke_times",
+         parser.get_highest_keystroke_times, arrays.get_highest_keystroke_times),
+        ("map_chars_to_times", parser.map_chars_to_times, arrays.map_chars_to_times),
+    ]
+    print(f"{'metric':<30}{'python':>10}{'numpy':>10}{'speedup':>10}  match")
+    for name, python_function, numpy_function in cases:
+        expected, python_seconds = time_call(python_function)
+        result, numpy_seconds = time_call(numpy_function)
+        if isinstance(expected, dict) and name == "map_chars_to_times":
+            match = list(expected) == list(result) and all(
+                abs(expected[key] - result[key]) < 1e-9 for key in expected)
+        else:
+            match = expected == result
+        speedup = python_seconds / numpy_seconds if numpy_seconds else float('inf')
+        print(f"{name:<30}{python_seconds:>9.3f}s{numpy_seconds:>9.3f}s"
+              f"{speedup:>9.1f}x  {match}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n",
+        "--keystrokes",
+        type=int,
+        default=DEFAULT_KEYSTROKES,
+        help="The total number of keystrokes to generate.")
+    parser.add_argument(
+        "--log-length",
+        type=int,
+        default=DEFAULT_LOG_LENGTH,
+        help="The number of keystrokes per log.")
+
+    args = parser.parse_args()
+    main(args.keystrokes, args.log_length)
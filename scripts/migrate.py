@@ -0,0 +1,45 @@
+from utils.schema import migrate_logfile, read_schema_version, SCHEMA_VERSION
+
+DEFAULT_LOGFILE = "REG"
+
+
+def main(file=DEFAULT_LOGFILE, output=None, to_version=SCHEMA_VERSION) -> None:
+    """
+    Upgrade a logfile to the current schema version.
+
+    Parameters
+    ----------
+    - file (`str`): The logfile to migrate.
+    - output (`str`, optional): Write the migrated logfile here instead of in place.
+    - to_version (`int`): The schema version to upgrade to.
+    """
+    from_version = read_schema_version(file)
+    if from_version == to_version and output is None:
+        print(f"Logfile is already at schema version {to_version}.")
+        return
+    count = migrate_logfile(file, output, to_version)
+    print(f"Migrated {count} logs from version {from_version} to {to_version}.")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-f",
+        "--file",
+        default=DEFAULT_LOGFILE,
+        help="The logfile to migrate.")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Write the migrated logfile here instead of in place.")
+    parser.add_argument(
+        "-t",
+        "--to-version",
+        type=int,
+        default=SCHEMA_VERSION,
+        help="The schema version to upgrade to.")
+
+    args = parser.parse_args()
+    main(args.file, args.output, args.to_version)
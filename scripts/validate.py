@@ -0,0 +1,61 @@
+from json import dump as json_dump
+import sys
+
+from classes.log_validator import validate_logfile, VALIDATION_CHUNK_SIZE
+
+DEFAULT_LOGFILE = "REG"
+
+
+def main(file=DEFAULT_LOGFILE, workers=None, output=None,
+         chunk_size=VALIDATION_CHUNK_SIZE) -> int:
+    """
+    Validate a logfile and write a JSON report.
+
+    Parameters
+    ----------
+    - file (`str`): The logfile to validate.
+    - workers (`int`, optional): The number of worker processes.
+    - output (`str`, optional): Write the report here instead of stdout.
+
+    Returns
+    -------
+    - `int`: The exit code. 1 if any log failed validation.
+    """
+    report = validate_logfile(file, workers, chunk_size)
+    if output is None:
+        json_dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(output, "w") as f:
+            json_dump(report, f, indent=2)
+        print(f"{report['passed']}/{report['total']} logs passed. Report: {output}")
+    return 1 if report['failed'] else 0
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-f",
+        "--file",
+        default=DEFAULT_LOGFILE,
+        help="The logfile to validate.")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of worker processes.")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Write the JSON report to this file.")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=VALIDATION_CHUNK_SIZE,
+        help="The number of logs per worker task.")
+
+    args = parser.parse_args()
+    sys.exit(main(args.file, args.workers, args.output, args.chunk_size))
@@ -0,0 +1,605 @@
+import statistics
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+from pynput.keyboard import KeyCode
+from classes.key_analyzer import KeyParser
+from classes.features import FeatureMatrix, FeatureSchema
+from classes.similarity import SimilarityIndex
+from classes.key_arrays import np
+from classes.key_collector import KeyLogger
+from classes.log_validator import validate_logs
+from classes.parallel_analysis import analyze_logfiles
+from utils.diagnostics import Diagnostics, DIAGNOSTICS, INVALID_KEY_LENGTH, VALIDATION_MISMATCH
+from utils.helpers import is_key_valid
+from utils.metrics import DelayStats, DigraphStats, ErrorMetrics, LogSummary, QuantileSketch, iter_segments, percentile, rolling_series
+from utils.validation import Keystroke, KeystrokeList, CapsLockTransform, PruneShiftsTransform, PruneNullTimesTransform, BannedKeysTransform, log_digest
+
+
+class TestIncrementalValidation(unittest.TestCase):
+    def setUp(self):
+        self.logger = KeyLogger(filename=None)
+        for char in 'hello':
+            self.logger.handle_keypress(KeyCode.from_char(char))
+
+    def test_matches_full_validation(self):
+        self.assertIsNone(self.logger.mismatch_index)
+        self.assertEqual(self.logger.none_count, 1)
+        self.assertTrue(self.logger.is_loggable())
+        self.assertTrue(self.logger.is_loggable(
+            self.logger.keystrokes, self.logger.typed_string))
+
+    def test_catches_divergence(self):
+        # Non-printable chars are typed but cannot be decoded from keystrokes
+        self.logger.handle_keypress(KeyCode.from_char('\x01'))
+        self.assertEqual(self.logger.mismatch_index, 5)
+        self.assertFalse(self.logger.is_loggable())
+
+    def test_set_internal_log(self):
+        keystrokes = KeystrokeList([Keystroke("'a'", None), Keystroke(
+            "'b'", 0.1), Keystroke('Key.backspace', 0.1)])
+        self.assertTrue(self.logger.set_internal_log(keystrokes, 'a'))
+        self.assertIsNone(self.logger.mismatch_index)
+        self.assertTrue(self.logger.is_loggable())
+
+
+class TestLogValidator(unittest.TestCase):
+    def test_report_reasons(self):
+        good = {'id': 'A000', 'string': 'ab',
+                'keystrokes': [["'a'", None], ["'b'", 0.1]]}
+        raw_logs = [
+            dict(good, keystrokes=list(good['keystrokes'])) for _ in range(6)]
+        raw_logs[1]['string'] = 'abc'
+        raw_logs[3] = {'id': 'A003', 'string': 'ab'}
+        raw_logs[4]['keystrokes'] = [["'a'", None], ["'b'", None]]
+        failures = validate_logs(raw_logs, max_workers=2, chunk_size=2)
+        self.assertEqual([failure['index'] for failure in failures], [1, 3, 4])
+        self.assertEqual(failures[0]['reasons'], ['string_mismatch'])
+        self.assertEqual(failures[1]['reasons'], ['corrupt'])
+        self.assertEqual(failures[2]['reasons'], ['extra_null_time'])
+
+
+class TestKeystrokePipeline(unittest.TestCase):
+    def make_keystrokes(self) -> KeystrokeList:
+        return KeystrokeList([
+            Keystroke('Key.shift', None),
+            Keystroke("'a'", 0.1),
+            Keystroke('Key.caps_lock', 0.1),
+            Keystroke("'b'", None),
+            Keystroke('Key.shift', 0.1),
+            Keystroke("'√'", 0.1),
+            Keystroke("'1'", 0.1),
+            Keystroke('Key.caps_lock', 0.1),
+            Keystroke("'c'", 0.1),
+        ])
+
+    def test_fused_matches_separate_passes(self):
+        separate = self.make_keystrokes()
+        separate.process_caps_lock()
+        separate.prune_shifts()
+        separate.prune_bad_nuns()
+        fused = self.make_keystrokes()
+        fused.transform(CapsLockTransform(), PruneShiftsTransform(),
+                        PruneNullTimesTransform())
+        self.assertEqual(fused, separate)
+        self.assertEqual(len(fused), 7)
+        self.assertEqual([keystroke.key for keystroke in fused],
+                         ["'a'", 'Key.caps_lock', "'B'", "'√'", "'1'", 'Key.caps_lock', "'c'"])
+
+    def test_custom_transform(self):
+        keystrokes = self.make_keystrokes()
+        keystrokes.transform(BannedKeysTransform(['√']), PruneShiftsTransform())
+        self.assertEqual([keystroke.unicode_char for keystroke in keystrokes if keystroke.unicode_char],
+                         ['a', 'b', '1', 'c'])
+
+
+class TestKeyParserChanges(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.filepath = path.join(self.tempdir.name, 'logs.json')
+        with open(self.filepath, 'w') as f:
+            f.write('[{"id": "A000", "string": "ab", "keystrokes": [["\'a\'", null], ["\'b\'", 0.1]]}, '
+                    '{"id": "A001", "string": "ab", "keystrokes": [["\'a\'", null], ["\'b\'", 0.2]]}]')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_change_detection(self):
+        parser = KeyParser(self.filepath)
+        version = parser.version
+        self.assertFalse(parser.has_unsaved_changes())
+        parser.logs[0]['keystrokes'][1].time = 0.3
+        parser.mark_modified()
+        self.assertGreater(parser.version, version)
+        self.assertTrue(parser.has_unsaved_changes())
+        parser.nuke_duplicates()
+        parser.dump_modified_logs()
+        self.assertFalse(parser.has_unsaved_changes())
+        reloaded = KeyParser(self.filepath)
+        self.assertEqual(len(reloaded), 1)
+        self.assertEqual(reloaded.logs[0]['keystrokes'][1].time, 0.3)
+        # Legacy logfiles keep their implicit version when saved
+        self.assertEqual(reloaded.schema_version, 1)
+        with open(self.filepath, 'r') as f:
+            self.assertTrue(f.read().startswith('[{"id"'))
+
+
+class TestIdIndex(unittest.TestCase):
+    def test_lookups(self):
+        parser = KeyParser(None, preload=False)
+        parser.logs = [{'id': f"A{i:03d}", 'string': f"s{i % 3}", 'keystrokes': KeystrokeList(
+            [Keystroke(f"'{i % 10}'", None)])} for i in range(6)]
+        self.assertTrue(parser.is_id_present('A004'))
+        self.assertTrue(parser.is_id_present('*s2'))
+        self.assertFalse(parser.is_id_present('A006'))
+        self.assertEqual(parser.get_strings('A004'), ['s1'])
+        # Exact strings match the first log with that string
+        self.assertEqual(parser.get_keystrokes('*s1')[0].key, "'1'")
+        with self.assertRaises(ValueError):
+            parser.get_keystrokes('A006')
+        parser.logs.append({'id': 'A006', 'string': 'new', 'keystrokes': KeystrokeList()})
+        self.assertEqual(parser.find_log_index('A006'), 6)
+        parser.nuke_duplicates()
+        self.assertEqual(parser.find_log_index('*new'), 3)
+        self.assertIsNone(parser.find_log_index('A004'))
+
+
+class TestStoreKeystrokes(unittest.TestCase):
+    def test_shared_view(self):
+        parser = KeyParser(None, preload=False)
+        parser.logs = [{'id': f"A00{i}", 'string': 'ab', 'keystrokes': KeystrokeList(
+            [Keystroke("'a'", None), Keystroke("'b'", time)])} for i, time in enumerate((0.1, 0.2, 0.3))]
+        view = parser.get_store_keystrokes()
+        self.assertIs(parser.get_store_keystrokes(), view)
+        self.assertEqual(parser.store_offsets, [0, 2, 4, 6])
+        keystrokes = parser.get_keystrokes()
+        self.assertEqual(keystrokes, view)
+        keystrokes.append(Keystroke("'c'", 0.5))
+        self.assertEqual(len(view), 6)
+        self.assertEqual(parser.get_only_times(exclude_outliers=True), [0.1, 0.2, 0.3])
+        parser.logs.append({'id': 'A003', 'string': 'c', 'keystrokes': KeystrokeList([Keystroke("'c'", None)])})
+        self.assertEqual(len(parser.get_store_keystrokes()), 7)
+        parser.logs = parser.logs[:1]
+        self.assertEqual(parser.store_offsets, [0, 2])
+        self.assertEqual(parser.get_keystrokes(), parser.get_keystrokes('A000'))
+
+
+class TestNgramIndex(unittest.TestCase):
+    def test_search(self):
+        with TemporaryDirectory() as tempdir:
+            filepath = path.join(tempdir, 'logs.json')
+            with open(filepath, 'w') as f:
+                f.write('[' + ', '.join(
+                    f'{{"id": "A00{i}", "string": "{string}", "keystrokes": []}}'
+                    for i, string in enumerate(['the cat', 'a dog', 'cat and cat', 'concat'])) + ']')
+            parser = KeyParser(filepath)
+            hits = parser.search_strings('cat')
+            self.assertEqual([hit['id'] for hit in hits], ['A000', 'A002', 'A003'])
+            self.assertEqual(hits[1]['positions'], [0, 8])
+            self.assertEqual(parser.search_strings('cat', limit=1, ranked=True)[0]['id'], 'A002')
+            self.assertEqual(parser.search_strings('cats'), [])
+            self.assertEqual(parser.id_from_substring('do'), 'A001')
+            self.assertIsNone(parser.id_from_substring('bird'))
+            self.assertTrue(path.exists(filepath + '.ngrams'))
+            reloaded = KeyParser(filepath)
+            self.assertEqual(reloaded.search_strings('and')[0]['id'], 'A002')
+            # Editing keystrokes keeps the index, in memory and on disk
+            index = reloaded.get_ngram_index()
+            mtime = path.getmtime(filepath + '.ngrams')
+            reloaded.logs[0]['keystrokes'] = KeystrokeList(
+                [Keystroke("'t'", None), Keystroke("'h'", 0.2)])
+            reloaded.mark_modified()
+            self.assertIs(reloaded.get_ngram_index(), index)
+            self.assertEqual(path.getmtime(filepath + '.ngrams'), mtime)
+            # Appending without mark_modified still refreshes the index
+            reloaded.logs.append({'id': 'A004', 'string': 'foobar', 'keystrokes': KeystrokeList()})
+            self.assertEqual([hit['id'] for hit in reloaded.search_strings('bar')], ['A004'])
+            reloaded.logs = reloaded.logs[:1]
+            self.assertEqual(len(reloaded.search_strings('cat')), 1)
+
+
+class TestMemoization(unittest.TestCase):
+    def test_invalidated_by_version(self):
+        parser = KeyParser(None, preload=False)
+        parser.logs = [{'id': 'A000', 'string': 'ab', 'keystrokes': KeystrokeList(
+            [Keystroke("'a'", None), Keystroke("'b'", 0.1)])}]
+        stats = parser.get_stats()
+        stats['wpm'] = None
+        self.assertEqual(parser.get_stats()['wpm'], 120.0)
+        self.assertEqual(parser.get_stats(exclude_outliers=parser.exclude_outliers), parser.get_stats())
+        self.assertEqual(parser.memo_hits, 3)
+        keystrokes = parser.logs[0]['keystrokes']
+        self.assertEqual(parser.map_chars_to_times(keystrokes), {'b': 0.1})
+        self.assertEqual(parser.map_chars_to_times(KeystrokeList(list(keystrokes))), {'b': 0.1})
+        self.assertEqual(parser.memo_hits, 4)
+        keystrokes[1].time = 0.2
+        parser.mark_modified()
+        self.assertEqual(parser.get_stats()['wpm'], 60.0)
+        self.assertEqual(parser.memo_hits, 4)
+        parser.logs.append({'id': 'A001', 'string': 'ab', 'keystrokes': KeystrokeList(
+            [Keystroke("'a'", None), Keystroke("'b'", 0.1)])})
+        self.assertEqual(parser.get_stats()['keystroke_count'], 4)
+
+
+class TestMetricCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.filepath = path.join(self.tempdir.name, 'logs.json')
+        with open(self.filepath, 'w') as f:
+            f.write('[{"id": "A000", "string": "abc", "keystrokes": [["\'a\'", null], ["\'b\'", 0.1], ["\'c\'", 3.5]]}, '
+                    '{"id": "A001", "string": "ab", "keystrokes": [["\'a\'", null], ["\'b\'", 0.25]]}]')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_reuses_unchanged_logs(self):
+        uncached = KeyParser(self.filepath, cache_metrics=False)
+        parser = KeyParser(self.filepath)
+        for exclude_outliers in (True, False):
+            self.assertEqual(parser.get_stats(exclude_outliers=exclude_outliers),
+                             uncached.get_stats(exclude_outliers=exclude_outliers))
+            self.assertEqual(parser.map_chars_to_times(exclude_outliers=exclude_outliers),
+                             uncached.map_chars_to_times(exclude_outliers=exclude_outliers))
+        self.assertEqual(parser.get_highest_keystroke_times(),
+                         uncached.get_highest_keystroke_times())
+        self.assertEqual(parser.get_percentiles((50, 100), exclude_outliers=False),
+                         uncached.get_percentiles((50, 100), exclude_outliers=False))
+        self.assertTrue(path.exists(self.filepath + '.metrics'))
+        reloaded = KeyParser(self.filepath)
+        self.assertEqual(reloaded.wpm(), uncached.wpm())
+        self.assertEqual((reloaded.metric_cache.hits, reloaded.metric_cache.misses), (2, 0))
+        reloaded.logs[1]['keystrokes'][1].time = 0.5
+        reloaded.mark_modified()
+        reloaded.get_stats()
+        self.assertEqual(reloaded.metric_cache.misses, 1)
+
+    def test_appended_and_duplicate_logs(self):
+        parser = KeyParser(self.filepath)
+        self.assertEqual(parser.get_stats()['keystroke_count'], 5)
+        # A log appended without mark_modified, sharing an id with different content
+        parser.logs.append({'id': 'A000', 'string': 'a', 'keystrokes': KeystrokeList(
+            [Keystroke("'a'", None), Keystroke("'a'", 0.4)])})
+        self.assertEqual(len(parser.get_log_summaries()), 3)
+        self.assertEqual(parser.get_stats()['keystroke_count'], 7)
+        misses = parser.metric_cache.misses
+        parser.get_log_summaries()
+        self.assertEqual(parser.metric_cache.misses, misses)
+        self.assertFalse(parser.metric_cache.modified)
+
+
+class TestParallelAnalysis(unittest.TestCase):
+    def test_matches_key_parser(self):
+        with TemporaryDirectory() as tempdir:
+            for name, times in (('a.json', ('0.1', '3.5')), ('b.json', ('0.25', '0.2'))):
+                with open(path.join(tempdir, name), 'w') as f:
+                    f.write('[{"schema_version": 2}, {"id": "A000", "string": "abc", "keystrokes": '
+                            f'[["\'a\'", null], ["\'b\'", {times[0]}], ["\'c\'", {times[1]}]]}}]')
+            parser = KeyParser(None, preload=False, cache_metrics=False)
+            parser.logs = KeyParser(path.join(tempdir, 'a.json')).logs + \
+                KeyParser(path.join(tempdir, 'b.json')).logs
+            result = analyze_logfiles(path.join(tempdir, '*.json'), max_workers=2, chunk_size=1)
+            self.assertEqual(len(result['filepaths']), 2)
+            self.assertEqual(result['log_count'], 2)
+            self.assertEqual(result['stats'], parser.get_stats())
+            serial = analyze_logfiles(result['filepaths'], exclude_outliers=False, max_workers=1)
+            self.assertEqual(serial['stats'], parser.get_stats(exclude_outliers=False))
+            self.assertEqual(serial['character_times'],
+                             parser.map_chars_to_times(exclude_outliers=False))
+
+
+class TestCumulativeTimes(unittest.TestCase):
+    def test_range_queries(self):
+        keystrokes = KeystrokeList([Keystroke("'a'", None), Keystroke(
+            "'b'", 0.5), Keystroke("'c'", 0.25), Keystroke("'d'", 0.25)])
+        self.assertEqual(keystrokes.cumulative_times(), [0.0, 0.5, 0.75, 1.0])
+        self.assertEqual(keystrokes.elapsed(1, 3), 0.5)
+        self.assertEqual(keystrokes.wpm_between(1, 3), 48.0)
+        self.assertEqual(keystrokes.index_at(0.6), 1)
+        self.assertEqual(keystrokes.index_at(1.0), 3)
+        keystrokes.append(Keystroke("'e'", 1.0))
+        self.assertEqual(keystrokes.elapsed(), 2.0)
+        keystrokes[1] = Keystroke("'b'", 1.5)
+        self.assertEqual(keystrokes.elapsed(), 3.0)
+        with self.assertRaises(IndexError):
+            keystrokes.elapsed(2, 1)
+
+
+class TestRollingSeries(unittest.TestCase):
+    def test_windows(self):
+        keystrokes = KeystrokeList([Keystroke("'a'", None)] + [
+            Keystroke("'b'", time) for time in (0.2, 0.2, 4.0, 0.1, 0.1, 0.2)])
+        series = rolling_series(keystrokes, 3, use_numpy=False)
+        self.assertEqual(series['index'], [2, 3, 4, 5, 6])
+        self.assertAlmostEqual(series['mean_delay'][0], 0.2)
+        self.assertAlmostEqual(series['wpm'][0], 60.0)
+        self.assertAlmostEqual(series['outlier_rate'][1], 1 / 3)
+        self.assertAlmostEqual(series['mean_delay'][1], 0.2)
+        seconds = rolling_series(keystrokes, 1.0, 'seconds', exclude_outliers=False, use_numpy=False)
+        self.assertEqual(seconds['index'], [3, 4, 5, 6])
+        self.assertAlmostEqual(seconds['mean_delay'][-1], 0.1 + 0.1 / 3)
+        if np is not None:
+            for window, unit in ((3, 'keystrokes'), (1.0, 'seconds'), (0.25, 'seconds')):
+                self.assertEqual(rolling_series(keystrokes, window, unit, use_numpy=True),
+                                 rolling_series(keystrokes, window, unit, use_numpy=False))
+
+
+class TestErrorMetrics(unittest.TestCase):
+    def test_corrections(self):
+        keys = ["'a'", "'b'", "'c'", 'Key.backspace', 'Key.backspace', "'d'", 'Key.backspace', "'e'"]
+        keystrokes = KeystrokeList([Keystroke(key, None if i == 0 else 0.5)
+                                    for i, key in enumerate(keys)])
+        errors = ErrorMetrics()
+        self.assertEqual(errors.add_keystrokes(keystrokes), keystrokes.to_string())
+        self.assertEqual((errors.typed_count, errors.char_count), (5, 2))
+        self.assertEqual((errors.backspace_count, errors.backspace_bursts, errors.chars_deleted), (3, 2, 3))
+        # Only the timed keystrokes count toward WPM: 4 typed, 1 net in 3.5 seconds
+        self.assertEqual(errors.gross_wpm(), 13.7)
+        self.assertEqual(errors.net_wpm(), 3.4)
+        self.assertEqual(errors.keystrokes_per_char(), 4.0)
+        merged = LogSummary.from_keystrokes(keystrokes).merge(LogSummary.from_keystrokes(keystrokes))
+        self.assertEqual(merged.errors.backspace_bursts, 4)
+        self.assertEqual(ErrorMetrics.from_dict(merged.errors.to_dict()).to_dict(),
+                         ErrorMetrics().merge(errors).merge(errors).to_dict())
+        parser = KeyParser(None, preload=False)
+        parser.logs = [{'id': 'A000', 'string': 'ae', 'keystrokes': keystrokes}]
+        stats = parser.get_stats()
+        self.assertEqual(stats['chars_deleted'], 3)
+        self.assertEqual(stats, parser.get_stats(km_id='A000'))
+        self.assertNotIn('net_wpm', parser.get_stats(include_errors=False))
+
+    def test_net_wpm_matches_wpm_without_corrections(self):
+        keystrokes = KeystrokeList([Keystroke("'a'", None)] + [
+            Keystroke(key, time) for key, time in (("'b'", 0.1), ("'c'", 0.1), ("'d'", 4.0), ("'e'", 0.1))])
+        parser = KeyParser(None, preload=False)
+        parser.logs = [{'id': 'A000', 'string': 'abcde', 'keystrokes': keystrokes}]
+        for exclude_outliers in (True, False):
+            stats = parser.get_stats(exclude_outliers=exclude_outliers)
+            self.assertEqual(stats['net_wpm'], stats['wpm'])
+            self.assertEqual(stats['gross_wpm'], stats['wpm'])
+        self.assertEqual(parser.get_stats(keystrokes)['net_wpm'], 120.0)
+
+
+class TestSegments(unittest.TestCase):
+    def test_bursts(self):
+        keystrokes = KeystrokeList([Keystroke("'a'", None)] + [
+            Keystroke("'b'", time) for time in (0.1, 0.2, 2.5, 0.1, 90.0)])
+        segments = list(iter_segments(keystrokes, pause=2.0))
+        self.assertEqual([(segment.start, segment.end) for segment in segments],
+                         [(0, 3), (3, 5), (5, 6)])
+        self.assertEqual([segment.pause for segment in segments], [None, 2.5, 90.0])
+        self.assertAlmostEqual(segments[0].duration, 0.3)
+        self.assertEqual(segments[1].stats.count, 1)
+        self.assertEqual(len(list(iter_segments(keystrokes, pause=60.0))), 2)
+        parser = KeyParser(None, preload=False)
+        parser.logs = [{'id': 'A000', 'string': '', 'keystrokes': keystrokes},
+                       {'id': 'A001', 'string': '', 'keystrokes': KeystrokeList([Keystroke("'a'", None)])}]
+        self.assertEqual([segment.log_index for segment in parser.get_segments()], [0, 0, 0, 1])
+        active = parser.get_active_stats()
+        self.assertEqual(active['keystroke_count'], 7)
+        self.assertEqual(active['highest_keystroke_time'], 0.2)
+
+
+class TestCompareKeystrokeLists(unittest.TestCase):
+    def test_table(self):
+        parser = KeyParser(None, preload=False)
+        parser.logs = [{'id': 'A000', 'string': 'abab', 'keystrokes': KeystrokeList([Keystroke("'a'", None), Keystroke(
+            "'b'", 0.1), Keystroke("'a'", 0.2), Keystroke("'b'", 0.1)])}]
+        slower = KeystrokeList([Keystroke("'a'", None), Keystroke("'b'", 0.3), Keystroke(
+            "'a'", 0.4), Keystroke("'b'", 0.3), Keystroke("'c'", 5.0)])
+        table = parser.compare_keystroke_lists(['A000', slower])
+        self.assertEqual(table['labels'], ['A000', '#1'])
+        self.assertEqual(table['global'][0]['difference'], 0.0)
+        self.assertEqual(table['global'][1]['difference'], 0.2)
+        self.assertGreater(table['global'][1]['effect_size'], 0)
+        self.assertEqual(table['characters']['b'][1]['average_delay'], 0.3)
+        # Identical delays have no spread, so no effect size
+        self.assertIsNone(table['characters']['b'][1]['effect_size'])
+        self.assertNotIn('c', table['characters'])
+        with_outliers = parser.compare_keystroke_lists(['A000', slower], exclude_outliers=False)
+        self.assertEqual(with_outliers['characters']['c'], [None, with_outliers['characters']['c'][1]])
+
+
+class TestDigests(unittest.TestCase):
+    def test_equality_and_hashing(self):
+        keystrokes = KeystrokeList([Keystroke("'a'", None), Keystroke("'b'", 0.1)])
+        same = KeystrokeList([Keystroke("'a'", None), Keystroke("'b'", 0.1)])
+        slower = KeystrokeList([Keystroke("'a'", None), Keystroke("'b'", 0.2)])
+        self.assertEqual(keystrokes, same)
+        self.assertNotEqual(keystrokes, slower)
+        self.assertEqual(len({keystrokes, same, slower}), 2)
+        same.append(Keystroke("'c'", 0.1))
+        self.assertNotEqual(keystrokes, same)
+        slower[1] = Keystroke("'b'", 0.1)
+        self.assertEqual(keystrokes, slower)
+        log = {'id': 'A000', 'string': 'ab', 'keystrokes': keystrokes}
+        self.assertEqual(log_digest(log), log_digest(dict(log, keystrokes=slower)))
+        self.assertNotEqual(log_digest(log), log_digest(dict(log, id='A001')))
+
+
+class TestDelayStats(unittest.TestCase):
+    def test_matches_separate_passes(self):
+        first = KeystrokeList([Keystroke("'a'", None), Keystroke(
+            "'b'", 0.12), Keystroke("'c'", 0.31), Keystroke("'d'", 4.0)])
+        second = KeystrokeList([Keystroke("'e'", None), Keystroke(
+            "'f'", 0.2), Keystroke("'g'", 0.05)])
+        parser = KeyParser(None, preload=False)
+        parser.logs = [{'id': 'A000', 'string': 'abcd', 'keystrokes': first},
+                       {'id': 'A001', 'string': 'efg', 'keystrokes': second}]
+        times = [0.12, 0.31, 0.2, 0.05]
+        stats = parser.get_stats()
+        self.assertEqual(stats['keystroke_count'], 7)
+        self.assertEqual(stats['average_delay'], round(sum(times) / 4, 4))
+        self.assertEqual(stats['std_deviation'], round(statistics.stdev(times), 4))
+        self.assertEqual(stats['highest_keystroke_time'], 0.31)
+        self.assertEqual(stats['wpm'], parser.wpm())
+        self.assertEqual(stats['outlier_count'], 1)
+        merged = DelayStats().add_keystrokes(first).merge(
+            DelayStats().add_keystrokes(second))
+        self.assertEqual(merged.count, 4)
+        self.assertAlmostEqual(merged.std_deviation(), statistics.stdev(times))
+        self.assertEqual(parser.get_average_delay(second), 0.125)
+
+
+@unittest.skipIf(np is None, "NumPy not installed.")
+class TestFeatures(unittest.TestCase):
+    def test_matches_scalar_metrics(self):
+        keys = ["'t'", "'h'", "'e'", 'Key.backspace', 'Key.backspace', "'e'", "'t'", "'h'"]
+        times = [None, 0.1, 0.2, 3.0, 0.3, 0.4, 0.5, 0.3]
+        keystrokes = KeystrokeList([Keystroke(key, time) for key, time in zip(keys, times)])
+        parser = KeyParser(None, preload=False)
+        parser.logs = [{'id': 'A000', 'string': 'eth', 'keystrokes': keystrokes},
+                       {'id': 'A001', 'string': '', 'keystrokes': KeystrokeList()}]
+        schema = FeatureSchema(digraphs=("th", ("'backspace'", "'backspace'")),
+                               keys=("t", "'backspace'", "z"), percentiles=(0, 50, 90))
+        features = parser.get_feature_matrix(schema)
+        self.assertIs(parser.get_feature_matrix(schema), features)
+        self.assertEqual(features.matrix.shape, (2, len(schema.names())))
+        self.assertTrue(np.isnan(features.matrix[1, :3]).all())
+        row = dict(zip(features.names, features.matrix[0]))
+        delays = sorted(parser.get_only_times(keystrokes, exclude_outliers=True))
+        self.assertAlmostEqual(row['mean_delay'], parser.get_average_delay(keystrokes), 4)
+        self.assertAlmostEqual(row['std_delay'], statistics.stdev(delays))
+        for q in schema.percentiles:
+            self.assertAlmostEqual(row[f'p{q}'], percentile(delays, q))
+        self.assertAlmostEqual(row['key:t'], 0.5)
+        self.assertAlmostEqual(row["key:'backspace'"], 1.65)
+        self.assertTrue(np.isnan(row['key:z']))
+        self.assertAlmostEqual(row['digraph:th'], 0.2)
+        self.assertAlmostEqual(row["digraph:'backspace''backspace'"], 0.3)
+        self.assertEqual(row['burst_count'], len(list(iter_segments(keystrokes))))
+        self.assertAlmostEqual(row['backspace_rate'], 2 / 8)
+        self.assertAlmostEqual(row['backspace_burst_rate'], 1 / 8)
+        with TemporaryDirectory() as tempdir:
+            filepath = path.join(tempdir, 'features.npz')
+            features.save(filepath)
+            loaded = FeatureMatrix.load(filepath, features.ids, features.digest, schema.signature())
+            self.assertIsNotNone(loaded)
+            np.testing.assert_array_equal(loaded.matrix, features.matrix)
+            self.assertIsNone(FeatureMatrix.load(filepath, features.ids, features.digest,
+                                                 FeatureSchema().signature()))
+
+
+@unittest.skipIf(np is None, "NumPy not installed.")
+class TestSimilarity(unittest.TestCase):
+    def test_nearest_logs(self):
+        def log(km_id, delay):
+            return {'id': km_id, 'string': 'abcd', 'keystrokes': KeystrokeList(
+                [Keystroke("'a'", None)] + [Keystroke(key, delay) for key in ("'b'", "'c'", "'d'")])}
+        parser = KeyParser(None, preload=False)
+        parser.logs = [log('A000', 0.1), log('A001', 0.5), log('A002', 0.12), log('A003', 0.9)]
+        schema = FeatureSchema(digraphs=(), keys=(), percentiles=(50,))
+        neighbors = parser.find_similar('A000', k=2, schema=schema)
+        self.assertEqual([neighbor['id'] for neighbor in neighbors], ['A002', 'A001'])
+        query = log('', 0.85)['keystrokes']
+        self.assertEqual(parser.find_similar(query, k=1, schema=schema)[0]['id'], 'A003')
+        # Appending without mark_modified rebuilds the matrix and index
+        parser.logs.append(log('A004', 0.95))
+        self.assertEqual(parser.get_feature_matrix(schema).matrix.shape[0], 5)
+        self.assertEqual(parser.find_similar('A004', k=1, schema=schema)[0]['id'], 'A003')
+        with self.assertRaises(ValueError):
+            parser.find_similar('missing')
+        rows = np.random.default_rng(0).normal(size=(400, 3))
+        features = FeatureMatrix([f"B{i:03d}" for i in range(400)], ['x', 'y', 'z'], rows, '', '')
+        index = SimilarityIndex(features, cluster_count=8)
+        exact = index.search(rows[7], k=5, approximate=False)
+        self.assertEqual(exact[0]['index'], 7)
+        self.assertEqual(index.search(rows[7], k=5, probes=8), exact)
+
+
+@unittest.skipIf(np is None, "NumPy not installed.")
+class TestKeyArrays(unittest.TestCase):
+    def test_matches_key_parser(self):
+        parser = KeyParser(None, preload=False)
+        parser.logs = [
+            {'id': 'A000', 'string': 'abca', 'keystrokes': KeystrokeList([Keystroke("'a'", None), Keystroke(
+                "'b'", 0.12), Keystroke("'c'", 4.0), Keystroke("'a'", 0.3)])},
+            {'id': 'A001', 'string': '', 'keystrokes': KeystrokeList()},
+            {'id': 'A002', 'string': 'cb', 'keystrokes': KeystrokeList([Keystroke("'c'", None), Keystroke(
+                "'b'", 0.2)])}]
+        arrays = parser.get_key_arrays()
+        self.assertIs(parser.get_key_arrays(), arrays)
+        for exclude_outliers in (True, False):
+            self.assertEqual(arrays.get_stats(exclude_outliers),
+                             parser.get_stats(exclude_outliers=exclude_outliers, include_errors=False))
+            self.assertEqual(arrays.get_highest_keystroke_times(exclude_outliers),
+                             parser.get_highest_keystroke_times(exclude_outliers))
+            expected = parser.map_chars_to_times(exclude_outliers=exclude_outliers)
+            result = arrays.map_chars_to_times(exclude_outliers)
+            self.assertEqual(list(result), list(expected))
+            for key in expected:
+                self.assertAlmostEqual(result[key], expected[key])
+        self.assertEqual(list(arrays.get_only_times(log_index=2)), [0.2])
+        parser.mark_modified()
+        self.assertIsNot(parser.get_key_arrays(), arrays)
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_exact_then_bounded(self):
+        sketch = QuantileSketch(k=50)
+        for value in (0.3, 0.1, 0.2):
+            sketch.add(value)
+        self.assertAlmostEqual(sketch.quantile(50), 0.2)
+        parts = [QuantileSketch(k=50) for _ in range(4)]
+        for value in range(20000):
+            parts[value % 4].add(value / 20000)
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        self.assertEqual(merged.count, 20000)
+        self.assertLess(merged.size, 400)
+        for q in (10, 50, 95):
+            self.assertAlmostEqual(merged.quantile(q), q / 100, delta=0.02)
+        # Compaction is deterministic, so the same values give the same quantiles
+        repeated = QuantileSketch(k=50)
+        for value in range(20000):
+            repeated.add(value / 20000)
+        again = QuantileSketch.from_dict(repeated.to_dict())
+        for value in range(20000):
+            again.add(value / 20000)
+            repeated.add(value / 20000)
+        self.assertEqual(again.quantiles((10, 50, 95)), repeated.quantiles((10, 50, 95)))
+        restored = QuantileSketch.from_dict(merged.to_dict())
+        self.assertEqual(restored.quantile(50), merged.quantile(50))
+
+
+class TestDigraphs(unittest.TestCase):
+    def test_pairs_and_merge(self):
+        first = KeystrokeList([Keystroke("'a'", None), Keystroke("'b'", 0.1), Keystroke(
+            "'a'", 0.2), Keystroke("'b'", 0.3), Keystroke('Key.space', 4.0)])
+        second = KeystrokeList([Keystroke("'b'", None), Keystroke("'a'", 0.4)])
+        digraphs = DigraphStats().add_keystrokes(first)
+        self.assertEqual(len(digraphs), 2)
+        self.assertEqual(list(digraphs.get_delays('a', 'b')), [0.1, 0.3])
+        self.assertEqual(digraphs.percentile('a', 'b', 50), 0.2)
+        self.assertEqual(len(DigraphStats().add_keystrokes(first, exclude_outliers=False)), 3)
+        digraphs.merge(DigraphStats().add_keystrokes(second))
+        self.assertEqual(digraphs.get_stats('b', 'a').count, 2)
+        slowest = digraphs.slowest(1)[0]
+        self.assertEqual((slowest['first'], slowest['second'], slowest['count']), ('b', 'a', 2))
+        self.assertEqual(digraphs.fastest(1, min_count=2)[0]['mean'], 0.2)
+
+
+class TestDiagnostics(unittest.TestCase):
+    def test_bounded_samples(self):
+        diagnostics = Diagnostics(max_samples=2)
+        for i in range(5):
+            diagnostics.record('event', i)
+        diagnostics.add('batch', 3)
+        summary = diagnostics.summary()
+        self.assertEqual(summary.counts, {'event': 5, 'batch': 3})
+        self.assertEqual(summary.samples['event'], [0, 1])
+        self.assertEqual(summary.total, 8)
+
+    def test_hot_paths_record(self):
+        DIAGNOSTICS.reset()
+        self.assertFalse(is_key_valid('abc'))
+        keystrokes = KeystrokeList([Keystroke("'a'", None), Keystroke("'b'", 0.1)])
+        self.assertFalse(keystrokes.validate('ac'))
+        self.assertEqual(DIAGNOSTICS.count(INVALID_KEY_LENGTH), 1)
+        self.assertEqual(DIAGNOSTICS.summary().samples[VALIDATION_MISMATCH], [
+                         (1, 'c', 'b')])
+        DIAGNOSTICS.reset()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,14 @@
 import copy
 import unittest
-from utils.validation import KeystrokeEncoder, KeystrokeDecoder, KeystrokeList, Keystroke
+from io import StringIO
+from utils.validation import KeystrokeEncoder, KeystrokeDecoder, KeystrokeList, Keystroke, dump_logs
+from utils.settings import ABSOLUTE_SIM_FILEPATH
+from utils.schema import iter_raw_entries, migrate_logfile, read_schema_version, SCHEMA_VERSION
+from os import path
+from tempfile import TemporaryDirectory
 from json import loads as json_loads
 from json import dumps as json_dumps
+from json import load as json_load
 
 
 class TestKeystrokeEncoder(unittest.TestCase):
@@ -87,6 +93,86 @@ class TestKeystrokeDecoder(unittest.TestCase):
         print(json_encoded_log_list)
 
 
+class TestStreamingEncoder(unittest.TestCase):
+    def setUp(self):
+        self.keystrokes = KeystrokeList(
+            [Keystroke("'é'", None), Keystroke('Key.space', 0.1), Keystroke("'\"'", 3.0012)])
+        self.logs = [
+            {'id': 'A000', 'string': 'é "', 'keystrokes': self.keystrokes},
+            {'id': 'A001', 'string': '', 'keystrokes': KeystrokeList()},
+            {'id': 'A002', 'string': 'a', 'keystrokes': [['a', None]]},
+        ]
+
+    def dump_to_string(self, logs) -> str:
+        stream = StringIO()
+        dump_logs(logs, stream, chunk_size=2)
+        return stream.getvalue()
+
+    def test_matches_json_dump(self):
+        expected = json_dumps(self.logs, cls=KeystrokeEncoder)
+        self.assertEqual(self.dump_to_string(self.logs), expected)
+        self.assertEqual(self.dump_to_string([]), '[]')
+
+    def test_matches_logfile(self):
+        with open(ABSOLUTE_SIM_FILEPATH, 'r') as f:
+            logs = json_load(f, cls=KeystrokeDecoder)
+        expected = json_dumps(logs, cls=KeystrokeEncoder)
+        self.assertEqual(self.dump_to_string(logs), expected)
+
+
+class TestSchemaMigration(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.filepath = path.join(self.tempdir.name, 'legacy.json')
+        self.raw_logs = [
+            {'id': 'A000', 'string': 'A', 'keystrokes': [
+                ['Key.shift', None], ["'A'", 0.2], ['Key.shift', 0.1]]},
+            {'id': 'A001', 'string': 'b 12', 'keystrokes': [
+                ["'b'", None], ['Key.space', 0.1], ["'1'", 0.1], ["'2'", 12.5]]},
+        ]
+        with open(self.filepath, 'w') as f:
+            f.write(json_dumps(self.raw_logs))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_streaming_reader(self):
+        for chunk_size in (1, 3, 7, 1 << 16):
+            with open(self.filepath, 'r') as f:
+                entries = list(iter_raw_entries(f, chunk_size))
+            self.assertEqual(entries, self.raw_logs)
+        self.assertEqual(list(iter_raw_entries(StringIO(' [ ] '))), [])
+        self.assertEqual(list(iter_raw_entries(StringIO('[12345, 6]'), 2)), [12345, 6])
+
+    def test_streaming_reader_large_entry(self):
+        large_log = {'id': 'A002', 'string': 'a' * 5000,
+                     'keystrokes': [["'a'", 0.1]] * 5000}
+        text = json_dumps([self.raw_logs[0], large_log, self.raw_logs[1]])
+        reader = StringIO(text)
+        reads = 0
+        read = reader.read
+
+        def counting_read(size):
+            nonlocal reads
+            reads += 1
+            return read(size)
+        reader.read = counting_read
+        self.assertEqual(list(iter_raw_entries(reader, 64)),
+                         [self.raw_logs[0], large_log, self.raw_logs[1]])
+        # Reads grow with the entry instead of staying one chunk each
+        self.assertLess(reads, 40)
+        self.assertGreater(len(text), 64 * 1000)
+
+    def test_migrate_logfile(self):
+        self.assertEqual(read_schema_version(self.filepath), 1)
+        self.assertEqual(migrate_logfile(self.filepath), 2)
+        self.assertEqual(read_schema_version(self.filepath), SCHEMA_VERSION)
+        with open(self.filepath, 'r') as f:
+            entries = json_load(f)
+        self.assertEqual(entries[1]['keystrokes'], [["'A'", None]])
+        self.assertEqual(entries[2], self.raw_logs[1])
+
+
 def run_encoder_test():
     unittest.main()
 
@@ -4,6 +4,30 @@ DEFAULT_LOG_ID = "A000"
 
 EMPTY_WRAPPED_CHAR = "''"
 APOSTROPHE = "'"
+
+# Display names for special keys in plots. These may be changed in the future.
+SPECIAL_KEY_DISPLAY_NAMES = {
+    "'STOP'": "Stop",
+    "'Key.space'": "Space",
+    "'Key.enter'": "Enter",
+    "'Key.backspace'": "Backspace",
+    "'Key.tab'": "Tab",
+    "'Key.caps_lock'": "Caps Lock",
+    "'Key.shift'": "Shift",
+}
+
+# Stable integer codes for legal keys. Chars use their ASCII code point.
+# Append new special keys at the end so stored codes remain valid.
+SPECIAL_KEY_CODES = {
+    "'space'": 128,
+    "'backspace'": 129,
+    "'shift'": 130,
+    "'caps_lock'": 131,
+    "'tab'": 132,
+    "'enter'": 133,
+    "'STOP'": 134,
+}
+KEY_CODE_COUNT = 135
 SHIFTED_CHARS = r'~!@#$%^&*()_+{}|:"<>?'
 KEYBOARD_CHARS = string.ascii_letters + \
     string.digits + string.punctuation + ' \n\t'
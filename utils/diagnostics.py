@@ -0,0 +1,119 @@
+# This file is for counting diagnostic events in hot paths without printing.
+
+# Standard library imports
+import atexit
+import logging
+from typing import Any
+
+# KeyMaster imports
+from utils.settings import DIAGNOSTIC_SAMPLE_LIMIT, LOG_DIAGNOSTICS_AT_EXIT
+
+# Categories
+INVALID_KEY_LENGTH = "invalid_key_length"
+INVALID_KEYSTROKE = "invalid_keystroke"
+VALIDATION_MISMATCH = "validation_mismatch"
+CAPS_LOCK_SWAP = "caps_lock_swap"
+NULL_TIME_REMOVED = "null_time_removed"
+NULL_TIME_REPLACED = "null_time_replaced"
+OUTLIER = "outlier"
+
+
+class DiagnosticsSummary:
+    """
+    A snapshot of the events counted by a Diagnostics collector.
+
+    Attributes
+    ----------
+    - counts (`dict[str, int]`): The number of events per category.
+    - samples (`dict[str, list]`): Up to `max_samples` raw samples per category.
+    """
+
+    def __init__(self, counts: dict[str, int],
+                 samples: dict[str, list[Any]]) -> None:
+        self.counts = counts
+        self.samples = samples
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def to_dict(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the summary as {category: {"count": int, "samples": list}}.
+        """
+        return {category: {"count": count, "samples": self.samples.get(category, [])}
+                for category, count in self.counts.items()}
+
+    def __bool__(self) -> bool:
+        return self.total > 0
+
+    def __repr__(self) -> str:
+        if not self.counts:
+            return "Diagnostics: no events."
+        lines = [f"Diagnostics: {self.total} events."]
+        for category, count in sorted(self.counts.items()):
+            samples = self.samples.get(category, [])
+            lines.append(f"- {category}: {count} (e.g. {samples})")
+        return '\n'.join(lines)
+
+
+class Diagnostics:
+    """
+    Counts diagnostic events by category, keeping a bounded number of raw samples.
+
+    Recording an event is a dict update and, while samples are below the limit,
+    a list append. Samples are stored as given, so callers should pass raw values
+    rather than formatted strings.
+    """
+
+    def __init__(self, max_samples: int = DIAGNOSTIC_SAMPLE_LIMIT) -> None:
+        self.max_samples = max_samples
+        self.counts: dict[str, int] = {}
+        self.samples: dict[str, list[Any]] = {}
+
+    def record(self, category: str, sample: Any = None) -> None:
+        """
+        Count one event, keeping the sample if there is room.
+        """
+        self.counts[category] = self.counts.get(category, 0) + 1
+        if sample is not None:
+            samples = self.samples.setdefault(category, [])
+            if len(samples) < self.max_samples:
+                samples.append(sample)
+
+    def add(self, category: str, count: int) -> None:
+        """
+        Count several events at once.
+        """
+        if count > 0:
+            self.counts[category] = self.counts.get(category, 0) + count
+
+    def count(self, category: str) -> int:
+        return self.counts.get(category, 0)
+
+    def summary(self) -> DiagnosticsSummary:
+        """
+        Returns a snapshot of the counts and samples.
+        """
+        return DiagnosticsSummary(
+            dict(self.counts),
+            {category: list(samples) for category, samples in self.samples.items()})
+
+    def reset(self) -> None:
+        self.counts = {}
+        self.samples = {}
+
+    def log_summary(self, level: int = logging.INFO) -> None:
+        """
+        Log the summary, if any events were counted.
+        """
+        summary = self.summary()
+        if summary:
+            logging.log(level, repr(summary))
+
+
+# Shared collector used by the validation and analysis code
+DIAGNOSTICS = Diagnostics()
+
+if LOG_DIAGNOSTICS_AT_EXIT:
+    atexit.register(DIAGNOSTICS.log_summary)
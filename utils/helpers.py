@@ -10,6 +10,7 @@ from utils.settings import (
     SPECIAL_KEYS,
     BANNED_KEYS)
 from utils.constants import DEFAULT_LOG_ID, APOSTROPHE, KEYBOARD_CHARS
+from utils.diagnostics import DIAGNOSTICS, INVALID_KEY_LENGTH
 
 REPLACE_WONKY_UNICODE = False
 REPLACEMENTS = {
@@ -45,7 +46,7 @@ def is_key_valid(key: Key | KeyCode | str,
         # Make sure it is a wrapped character
         if not (len(key_string) ==
                 3 and key_string[0] == APOSTROPHE and key_string[-1] == APOSTROPHE):
-            print(f"Error - is_key_valid: Invalid key length: {key_string}<-")
+            DIAGNOSTICS.record(INVALID_KEY_LENGTH, key_string)
             return False
         char = key_string[1]
     else:
@@ -0,0 +1,1068 @@
+# This file is for streaming, mergeable keystroke metrics.
+
+# Standard library imports
+from array import array
+from math import ceil, sqrt
+from bisect import bisect_left
+from typing import Any, Iterable, Iterator, Sequence, TypedDict
+
+# KeyMaster imports
+from utils.constants import SPECIAL_KEY_DISPLAY_NAMES, SPECIAL_KEY_CODES, KEY_CODE_COUNT
+from utils.diagnostics import DIAGNOSTICS, OUTLIER
+from utils.settings import OUTLIER_CUTOFF, QUANTILE_SKETCH_K, ROUND_DIGITS, BURST_PAUSE
+from utils.validation import Keystroke, KeystrokeList, LegalKey
+
+# Third party imports
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+KEY_NAMES = {code: key for key, code in SPECIAL_KEY_CODES.items()}
+BACKSPACE_KEY = "'backspace'"
+
+# Rolling window units
+WINDOW_KEYSTROKES = "keystrokes"
+WINDOW_SECONDS = "seconds"
+
+
+def key_code(legal_key: LegalKey | str) -> int:
+    """
+    The stable integer code of a legal key, or of its `key` string.
+    """
+    key = legal_key if isinstance(legal_key, str) else legal_key.key
+    code = SPECIAL_KEY_CODES.get(key)
+    if code is not None:
+        return code
+    if len(key) != 1 or ord(key) >= 128:
+        raise ValueError(f"No key code for {key!r}.")
+    return ord(key)
+
+
+def key_name(code: int) -> str:
+    """
+    The legal key string of a key code.
+    """
+    if code < 128:
+        return chr(code)
+    return KEY_NAMES[code]
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """
+    The q-th percentile (0-100) of sorted values, interpolating linearly like numpy.percentile.
+    """
+    if not sorted_values:
+        raise ValueError("No values.")
+    if not 0 <= q <= 100:
+        raise ValueError("Percentile must be between 0 and 100.")
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+class DelayStats:
+    """
+    Single-pass statistics over keystroke delays.
+
+    Mean and variance use Welford's algorithm, so every metric in
+    KeyParser.get_stats comes from one traversal. Two DelayStats can be merged,
+    which lets partial results from different logs or processes be combined.
+
+    Attributes
+    ----------
+    - count (`int`): The number of delays included.
+    - total (`float`): The sum of included delays, in seconds.
+    - mean (`float`): The running mean of included delays.
+    - m2 (`float`): The running sum of squared differences from the mean.
+    - max (`float` | `None`): The highest included delay.
+    - outlier_count (`int`): The number of delays above OUTLIER_CUTOFF.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.max: float | None = None
+        self.outlier_count = 0
+
+    def add(self, delay: float) -> None:
+        """
+        Include a delay.
+        """
+        self.count += 1
+        self.total += delay
+        difference = delay - self.mean
+        self.mean += difference / self.count
+        self.m2 += difference * (delay - self.mean)
+        if self.max is None or delay > self.max:
+            self.max = delay
+
+    def add_keystrokes(self, keystrokes: KeystrokeList,
+                       exclude_outliers: bool = True,
+                       errors: 'ErrorMetrics | None' = None) -> 'DelayStats':
+        """
+        Include every timed keystroke. Delays above OUTLIER_CUTOFF are counted
+        as outliers, and only included when `exclude_outliers` is False.
+        Pass `errors` to count corrections in the same traversal.
+        """
+        chars: list[str] = []
+        for keystroke in keystrokes:
+            if errors is not None:
+                errors.add(keystroke, chars)
+            time = keystroke.time
+            if time is None:
+                continue
+            if time > OUTLIER_CUTOFF:
+                self.outlier_count += 1
+                if exclude_outliers:
+                    DIAGNOSTICS.record(OUTLIER, (keystroke.key, time))
+                    continue
+            self.add(time)
+        if errors is not None:
+            errors.end_log()
+        return self
+
+    def merge(self, other: 'DelayStats') -> 'DelayStats':
+        """
+        Combine another DelayStats into this one (Chan et al. parallel variance).
+        """
+        if self.count == 0:
+            self.count = other.count
+            self.total = other.total
+            self.mean = other.mean
+            self.m2 = other.m2
+            self.max = other.max
+        elif other.count > 0:
+            count = self.count + other.count
+            difference = other.mean - self.mean
+            self.mean += difference * other.count / count
+            self.m2 += other.m2 + difference * difference * \
+                self.count * other.count / count
+            self.count = count
+            self.total += other.total
+            if self.max is None or (
+                    other.max is not None and other.max > self.max):
+                self.max = other.max
+        self.outlier_count += other.outlier_count
+        return self
+
+    def average(self) -> float | None:
+        if self.count == 0:
+            return None
+        return self.total / self.count
+
+    def std_deviation(self) -> float | None:
+        """
+        The sample standard deviation, like statistics.stdev.
+        """
+        if self.count < 2:
+            return None
+        return sqrt(max(self.m2, 0.0) / (self.count - 1))
+
+    def wpm(self) -> float | None:
+        """
+        Words per minute, as CPM/5. None if no time was recorded.
+        """
+        if self.count == 0 or self.total == 0:
+            return None
+        cpm = (self.count / self.total) * 60
+        return round(cpm / 5, 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "m2": self.m2,
+            "max": self.max,
+            "outlier_count": self.outlier_count}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'DelayStats':
+        stats = cls()
+        stats.count = data["count"]
+        stats.total = data["total"]
+        stats.mean = data["mean"]
+        stats.m2 = data["m2"]
+        stats.max = data["max"]
+        stats.outlier_count = data["outlier_count"]
+        return stats
+
+    def format_stats(self, keystroke_count: int) -> dict[str, int | float | None]:
+        """
+        The statistics dict returned by KeyParser.get_stats.
+        """
+        average = self.average()
+        std_deviation = self.std_deviation()
+        return {
+            "keystroke_count": keystroke_count,
+            "average_delay": None if average is None else round(average, 4),
+            "std_deviation": None if std_deviation is None else round(std_deviation, ROUND_DIGITS),
+            "highest_keystroke_time": self.max,
+            "wpm": self.wpm(),
+            "outlier_count": self.outlier_count
+        }
+
+    def __repr__(self) -> str:
+        return (f"DelayStats(count={self.count}, mean={self.mean:.4f}, "
+                f"max={self.max}, outliers={self.outlier_count})")
+
+
+class ErrorMetrics:
+    """
+    Single-pass error-correction metrics, computed while decoding keystrokes.
+
+    Each keystroke is applied like KeystrokeList.to_string, and the change in
+    decoded length tells typed characters from deleted ones. Counts are sums,
+    so metrics of several logs merge exactly. Gross and net WPM only count the
+    characters whose delay is in the time, by the same rule as DelayStats.wpm,
+    so an error-free log has net_wpm equal to wpm.
+
+    Attributes
+    ----------
+    - keystroke_count (`int`): The number of keystrokes.
+    - typed_count (`int`): Characters typed, including the ones deleted later.
+    - char_count (`int`): Characters left after corrections.
+    - backspace_count (`int`): Backspace keystrokes.
+    - backspace_bursts (`int`): Runs of consecutive backspaces.
+    - chars_deleted (`int`): Characters removed by backspace.
+    - time (`float`): The sum of delays up to OUTLIER_CUTOFF, in seconds.
+    - outlier_time (`float`): The sum of delays above OUTLIER_CUTOFF, in seconds.
+    - timed_typed_count (`int`): Characters typed with a delay up to OUTLIER_CUTOFF.
+    - timed_char_count (`int`): The net change in characters of those keystrokes.
+    - outlier_typed_count (`int`): Characters typed with a delay above OUTLIER_CUTOFF.
+    - outlier_char_count (`int`): The net change in characters of those keystrokes.
+    """
+
+    def __init__(self) -> None:
+        self.keystroke_count = 0
+        self.typed_count = 0
+        self.char_count = 0
+        self.backspace_count = 0
+        self.backspace_bursts = 0
+        self.chars_deleted = 0
+        self.time = 0.0
+        self.outlier_time = 0.0
+        self.timed_typed_count = 0
+        self.timed_char_count = 0
+        self.outlier_typed_count = 0
+        self.outlier_char_count = 0
+        self._after_backspace = False
+
+    def add(self, keystroke: Keystroke, chars: list[str]) -> None:
+        """
+        Apply a keystroke to the decoded characters of its log and count it.
+        """
+        self.keystroke_count += 1
+        length = len(chars)
+        keystroke.apply_to(chars)
+        change = len(chars) - length
+        typed = max(change, 0)
+        self.typed_count += typed
+        self.chars_deleted += typed - change
+        self.char_count += change
+        time = keystroke.time
+        if time is not None:
+            if time > OUTLIER_CUTOFF:
+                self.outlier_time += time
+                self.outlier_typed_count += typed
+                self.outlier_char_count += change
+            else:
+                self.time += time
+                self.timed_typed_count += typed
+                self.timed_char_count += change
+        legal_key = keystroke.legal_key
+        is_backspace = legal_key is not None and legal_key.key == BACKSPACE_KEY
+        if is_backspace:
+            self.backspace_count += 1
+            if not self._after_backspace:
+                self.backspace_bursts += 1
+        self._after_backspace = is_backspace
+
+    def add_keystrokes(self, keystrokes: KeystrokeList) -> str:
+        """
+        Count every keystroke of a log.
+
+        Returns:
+            `str`: The decoded string, as from KeystrokeList.to_string.
+        """
+        chars: list[str] = []
+        for keystroke in keystrokes:
+            self.add(keystroke, chars)
+        self.end_log()
+        return ''.join(chars)
+
+    def end_log(self) -> None:
+        """
+        Mark the end of a log, so a backspace burst does not continue into the next one.
+        """
+        self._after_backspace = False
+
+    def merge(self, other: 'ErrorMetrics') -> 'ErrorMetrics':
+        self.keystroke_count += other.keystroke_count
+        self.typed_count += other.typed_count
+        self.char_count += other.char_count
+        self.backspace_count += other.backspace_count
+        self.backspace_bursts += other.backspace_bursts
+        self.chars_deleted += other.chars_deleted
+        self.time += other.time
+        self.outlier_time += other.outlier_time
+        self.timed_typed_count += other.timed_typed_count
+        self.timed_char_count += other.timed_char_count
+        self.outlier_typed_count += other.outlier_typed_count
+        self.outlier_char_count += other.outlier_char_count
+        return self
+
+    def _wpm(self, char_count: int, exclude_outliers: bool) -> float | None:
+        seconds = self.time if exclude_outliers else self.time + self.outlier_time
+        if seconds == 0:
+            return None
+        cpm = (char_count / seconds) * 60
+        return round(cpm / 5, 1)
+
+    def gross_wpm(self, exclude_outliers: bool = True) -> float | None:
+        """
+        Words per minute of every timed typed character, as CPM/5.
+        """
+        typed_count = self.timed_typed_count
+        if not exclude_outliers:
+            typed_count += self.outlier_typed_count
+        return self._wpm(typed_count, exclude_outliers)
+
+    def net_wpm(self, exclude_outliers: bool = True) -> float | None:
+        """
+        Words per minute of the timed characters left after corrections, as CPM/5.
+        """
+        char_count = self.timed_char_count
+        if not exclude_outliers:
+            char_count += self.outlier_char_count
+        return self._wpm(char_count, exclude_outliers)
+
+    def keystrokes_per_char(self) -> float | None:
+        if self.char_count <= 0:
+            return None
+        return round(self.keystroke_count / self.char_count, ROUND_DIGITS)
+
+    def format_stats(self, exclude_outliers: bool = True) -> dict[str, int | float | None]:
+        """
+        The error statistics added to KeyParser.get_stats.
+        """
+        return {
+            "backspace_count": self.backspace_count,
+            "backspace_bursts": self.backspace_bursts,
+            "chars_deleted": self.chars_deleted,
+            "gross_wpm": self.gross_wpm(exclude_outliers),
+            "net_wpm": self.net_wpm(exclude_outliers),
+            "keystrokes_per_char": self.keystrokes_per_char()
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "keystroke_count": self.keystroke_count,
+            "typed_count": self.typed_count,
+            "char_count": self.char_count,
+            "backspace_count": self.backspace_count,
+            "backspace_bursts": self.backspace_bursts,
+            "chars_deleted": self.chars_deleted,
+            "time": self.time,
+            "outlier_time": self.outlier_time,
+            "timed_typed_count": self.timed_typed_count,
+            "timed_char_count": self.timed_char_count,
+            "outlier_typed_count": self.outlier_typed_count,
+            "outlier_char_count": self.outlier_char_count}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'ErrorMetrics':
+        metrics = cls()
+        for name, value in data.items():
+            setattr(metrics, name, value)
+        return metrics
+
+    def __repr__(self) -> str:
+        return (f"ErrorMetrics(keystrokes={self.keystroke_count}, chars={self.char_count}, "
+                f"backspaces={self.backspace_count}, deleted={self.chars_deleted})")
+
+
+class QuantileSketch:
+    """
+    A mergeable KLL quantile sketch over delays.
+
+    Values are kept in a stack of compactors. When the sketch is full, a level
+    is sorted and every other value is promoted with double the weight, so
+    memory stays around 3k values however many delays are added. Rank error is
+    roughly 1.7/k. Until the first compaction every value is kept, and
+    quantiles are exact. Each level alternates between promoting the even and
+    the odd values, instead of picking at random, so results are reproducible.
+
+    Attributes
+    ----------
+    - k (`int`): The accuracy parameter.
+    - count (`int`): The number of values added.
+    - compactors (`list[list[float]]`): Level h holds values of weight 2**h.
+    - compactions (`list[int]`): The number of times each level was compacted.
+    """
+
+    def __init__(self, k: int = QUANTILE_SKETCH_K) -> None:
+        if k < 2:
+            raise ValueError("k must be at least 2.")
+        self.k = k
+        self.count = 0
+        self.min: float | None = None
+        self.max: float | None = None
+        self.compactors: list[list[float]] = []
+        self.compactions: list[int] = []
+        self.size = 0
+        self.max_size = 0
+        self.grow()
+
+    def capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def grow(self) -> None:
+        self.compactors.append([])
+        self.compactions.append(0)
+        self.max_size = sum(self.capacity(level)
+                            for level in range(len(self.compactors)))
+
+    def add(self, value: float) -> None:
+        self.compactors[0].append(value)
+        self.count += 1
+        self.size += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self.size >= self.max_size:
+            self.compress()
+
+    def compress(self) -> None:
+        for level in range(len(self.compactors)):
+            compactor = self.compactors[level]
+            if len(compactor) < self.capacity(level):
+                continue
+            if level + 1 >= len(self.compactors):
+                self.grow()
+            compactor.sort()
+            # An odd value out stays at this level
+            leftover = [compactor.pop()] if len(compactor) % 2 else []
+            self.compactors[level + 1].extend(
+                compactor[self.compactions[level] % 2::2])
+            self.compactions[level] += 1
+            self.compactors[level] = leftover
+            self.size = sum(len(values) for values in self.compactors)
+            if self.size < self.max_size:
+                break
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if other.k != self.k:
+            raise ValueError("Cannot merge sketches with different k.")
+        while len(self.compactors) < len(other.compactors):
+            self.grow()
+        for level, values in enumerate(other.compactors):
+            self.compactors[level].extend(values)
+        self.count += other.count
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        self.size = sum(len(values) for values in self.compactors)
+        while self.size >= self.max_size:
+            self.compress()
+        return self
+
+    def quantile(self, q: float) -> float | None:
+        """
+        The approximate q-th percentile (0-100). None if the sketch is empty.
+        """
+        if self.count == 0:
+            return None
+        if not 0 <= q <= 100:
+            raise ValueError("Percentile must be between 0 and 100.")
+        if len(self.compactors) == 1:
+            return percentile(sorted(self.compactors[0]), q)
+        weighted = sorted((value, 1 << level)
+                          for level, values in enumerate(self.compactors)
+                          for value in values)
+        total_weight = sum(weight for _, weight in weighted)
+        target = q / 100 * total_weight
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return min(max(value, self.min), self.max)  # type: ignore
+        return self.max
+
+    def quantiles(self, qs: Sequence[float]) -> dict[float, float | None]:
+        return {q: self.quantile(q) for q in qs}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "k": self.k,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "compactors": self.compactors,
+            "compactions": self.compactions}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(data["k"])
+        sketch.count = data["count"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch.compactors = []
+        for _ in data["compactors"]:
+            sketch.grow()
+        sketch.compactors = [list(values) for values in data["compactors"]]
+        sketch.compactions = list(data.get("compactions", [0] * len(sketch.compactors)))
+        sketch.size = sum(len(values) for values in sketch.compactors)
+        return sketch
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class LogSummary:
+    """
+    Partial aggregates of a single log.
+
+    Whole-store metrics are a merge over these, so a log only needs to be read
+    again when its content changes.
+
+    Attributes
+    ----------
+    - keystroke_count (`int`): The number of keystrokes, timed or not.
+    - inliers (`DelayStats`): Delays up to OUTLIER_CUTOFF. Its outlier_count covers the whole log.
+    - outliers (`DelayStats`): Delays above OUTLIER_CUTOFF.
+    - key_times (`dict[str, list]`): Display key to [count, sum, outlier_count, outlier_sum].
+    - inlier_sketch (`QuantileSketch`): Quantiles of the inlier delays.
+    - outlier_sketch (`QuantileSketch`): Quantiles of the outlier delays.
+    - errors (`ErrorMetrics`): Backspace and correction counts.
+    """
+
+    def __init__(self, keystroke_count: int = 0,
+                 inliers: DelayStats | None = None,
+                 outliers: DelayStats | None = None,
+                 key_times: dict[str, list] | None = None,
+                 inlier_sketch: QuantileSketch | None = None,
+                 outlier_sketch: QuantileSketch | None = None,
+                 errors: ErrorMetrics | None = None) -> None:
+        self.keystroke_count = keystroke_count
+        self.inliers = inliers if inliers is not None else DelayStats()
+        self.outliers = outliers if outliers is not None else DelayStats()
+        self.key_times = key_times if key_times is not None else {}
+        self.inlier_sketch = inlier_sketch if inlier_sketch is not None else QuantileSketch()
+        self.outlier_sketch = outlier_sketch if outlier_sketch is not None else QuantileSketch()
+        self.errors = errors if errors is not None else ErrorMetrics()
+
+    @classmethod
+    def from_keystrokes(cls, keystrokes: KeystrokeList) -> 'LogSummary':
+        summary = cls(len(keystrokes))
+        key_times = summary.key_times
+        errors = summary.errors
+        chars: list[str] = []
+        for keystroke in keystrokes:
+            errors.add(keystroke, chars)
+            time = keystroke.time
+            if time is None:
+                continue
+            is_outlier = time > OUTLIER_CUTOFF
+            if is_outlier:
+                summary.outliers.add(time)
+                summary.outlier_sketch.add(time)
+            else:
+                summary.inliers.add(time)
+                summary.inlier_sketch.add(time)
+            legal_key = keystroke.legal_key
+            if legal_key is None:
+                continue
+            key = legal_key.key
+            if legal_key.is_special:
+                key = SPECIAL_KEY_DISPLAY_NAMES.get(key, key)
+            entry = key_times.get(key)
+            if entry is None:
+                entry = key_times[key] = [0, 0.0, 0, 0.0]
+            if is_outlier:
+                entry[2] += 1
+                entry[3] += time
+            else:
+                entry[0] += 1
+                entry[1] += time
+        summary.inliers.outlier_count = summary.outliers.count
+        errors.end_log()
+        return summary
+
+    def delays(self, exclude_outliers: bool = True) -> DelayStats:
+        """
+        Returns a new DelayStats for the log, like DelayStats.add_keystrokes.
+        """
+        stats = DelayStats().merge(self.inliers)
+        if not exclude_outliers:
+            stats.merge(self.outliers)
+        return stats
+
+    def format_stats(self, exclude_outliers: bool = True) -> dict[str, int | float | None]:
+        """
+        The statistics dict returned by KeyParser.get_stats, including error metrics.
+        """
+        return {**self.delays(exclude_outliers).format_stats(self.keystroke_count),
+                **self.errors.format_stats(exclude_outliers)}
+
+    def merge(self, other: 'LogSummary') -> 'LogSummary':
+        """
+        Combine another summary into this one, as if their keystrokes were one log.
+        """
+        self.keystroke_count += other.keystroke_count
+        self.inliers.merge(other.inliers)
+        self.outliers.merge(other.outliers)
+        self.inlier_sketch.merge(other.inlier_sketch)
+        self.outlier_sketch.merge(other.outlier_sketch)
+        self.errors.merge(other.errors)
+        for key, times in other.key_times.items():
+            entry = self.key_times.get(key)
+            if entry is None:
+                self.key_times[key] = list(times)
+            else:
+                for i, value in enumerate(times):
+                    entry[i] += value
+        return self
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "keystroke_count": self.keystroke_count,
+            "inliers": self.inliers.to_dict(),
+            "outliers": self.outliers.to_dict(),
+            "key_times": self.key_times,
+            "inlier_sketch": self.inlier_sketch.to_dict(),
+            "outlier_sketch": self.outlier_sketch.to_dict(),
+            "errors": self.errors.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'LogSummary':
+        return cls(data["keystroke_count"],
+                   DelayStats.from_dict(data["inliers"]),
+                   DelayStats.from_dict(data["outliers"]),
+                   data["key_times"],
+                   QuantileSketch.from_dict(data["inlier_sketch"]),
+                   QuantileSketch.from_dict(data["outlier_sketch"]),
+                   ErrorMetrics.from_dict(data["errors"]))
+
+
+def cohens_d(first: DelayStats, second: DelayStats) -> float | None:
+    """
+    The standardized mean difference (second - first) with a pooled standard deviation.
+    None if either side has fewer than two delays or there is no spread.
+    """
+    if first.count < 2 or second.count < 2:
+        return None
+    pooled_variance = (first.m2 + second.m2) / (first.count + second.count - 2)
+    if pooled_variance <= 0:
+        return None
+    return (second.mean - first.mean) / sqrt(pooled_variance)
+
+
+class TimingProfile:
+    """
+    Global and per-key delay statistics of one keystroke list, built in a single pass.
+
+    Attributes
+    ----------
+    - delays (`DelayStats`): Every usable delay.
+    - keys (`dict[str, DelayStats]`): Display key to the delays preceding that key.
+    """
+
+    def __init__(self) -> None:
+        self.delays = DelayStats()
+        self.keys: dict[str, DelayStats] = {}
+
+    @classmethod
+    def from_keystrokes(cls, keystrokes: KeystrokeList,
+                        exclude_outliers: bool = True) -> 'TimingProfile':
+        profile = cls()
+        delays = profile.delays
+        keys = profile.keys
+        for keystroke in keystrokes:
+            time = keystroke.time
+            if time is None:
+                continue
+            if time > OUTLIER_CUTOFF:
+                delays.outlier_count += 1
+                if exclude_outliers:
+                    continue
+            delays.add(time)
+            legal_key = keystroke.legal_key
+            if legal_key is None:
+                continue
+            key = legal_key.key
+            if legal_key.is_special:
+                key = SPECIAL_KEY_DISPLAY_NAMES.get(key, key)
+            key_stats = keys.get(key)
+            if key_stats is None:
+                key_stats = keys[key] = DelayStats()
+            key_stats.add(time)
+        return profile
+
+
+def merge_key_times(summaries: list[LogSummary],
+                    exclude_outliers: bool = True) -> dict[str, float]:
+    """
+    Average delay per display key across logs, like KeyParser.map_chars_to_times.
+    Keys are ordered by their first timed appearance.
+    """
+    sums: dict[str, float] = {}
+    counts: dict[str, int] = {}
+    for summary in summaries:
+        for key, (count, total, outlier_count, outlier_total) in summary.key_times.items():
+            if not exclude_outliers:
+                count += outlier_count
+                total += outlier_total
+            if count == 0:
+                continue
+            if key in sums:
+                sums[key] += total
+                counts[key] += count
+            else:
+                sums[key] = total
+                counts[key] = count
+    return {key: sums[key] / counts[key] for key in sums}
+
+
+class DigraphStats:
+    """
+    Transition delays between every consecutive pair of legal keys.
+
+    The delay of a keystroke is the time since the previous one, so it belongs
+    to the (previous key, key) pair. Delays are stored per pair in compact
+    arrays keyed on an integer pair code, which keeps exact percentiles
+    available and lets results from different logs or processes be merged.
+
+    Attributes
+    ----------
+    - delays (`dict[int, array]`): Pair code to the delays of that transition.
+    """
+
+    def __init__(self) -> None:
+        self.delays: dict[int, array] = {}
+
+    @staticmethod
+    def pair_code(first: int, second: int) -> int:
+        return first * KEY_CODE_COUNT + second
+
+    @staticmethod
+    def split_pair_code(pair: int) -> tuple[int, int]:
+        return divmod(pair, KEY_CODE_COUNT)
+
+    def add_keystrokes(self, keystrokes: KeystrokeList,
+                       exclude_outliers: bool = True) -> 'DigraphStats':
+        """
+        Include the transitions of a keystroke list. Pairs never span two lists.
+        """
+        delays = self.delays
+        previous = None
+        for keystroke in keystrokes:
+            legal_key = keystroke.legal_key
+            if legal_key is None:
+                previous = None
+                continue
+            code = key_code(legal_key)
+            time = keystroke.time
+            if previous is not None and time is not None and not (
+                    exclude_outliers and time > OUTLIER_CUTOFF):
+                pair = previous * KEY_CODE_COUNT + code
+                pair_delays = delays.get(pair)
+                if pair_delays is None:
+                    pair_delays = delays[pair] = array('d')
+                pair_delays.append(time)
+            previous = code
+        return self
+
+    def merge(self, other: 'DigraphStats') -> 'DigraphStats':
+        for pair, pair_delays in other.delays.items():
+            if pair in self.delays:
+                self.delays[pair].extend(pair_delays)
+            else:
+                self.delays[pair] = array('d', pair_delays)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.delays)
+
+    def get_delays(self, first: str, second: str) -> array:
+        """
+        The delays of a transition, given as legal key strings (e.g. 'a' or "'space'").
+        """
+        return self.delays.get(
+            self.pair_code(key_code(first), key_code(second)), array('d'))
+
+    def get_stats(self, first: str, second: str) -> DelayStats:
+        stats = DelayStats()
+        for delay in self.get_delays(first, second):
+            stats.add(delay)
+        return stats
+
+    def percentile(self, first: str, second: str, q: float) -> float | None:
+        pair_delays = self.get_delays(first, second)
+        if not pair_delays:
+            return None
+        return percentile(sorted(pair_delays), q)
+
+    def summarize(self, pair: int) -> dict[str, Any]:
+        """
+        Count, mean, standard deviation, median and 95th percentile of a pair code.
+        """
+        first, second = self.split_pair_code(pair)
+        pair_delays = self.delays[pair]
+        stats = DelayStats()
+        for delay in pair_delays:
+            stats.add(delay)
+        ordered = sorted(pair_delays)
+        return {
+            "first": key_name(first),
+            "second": key_name(second),
+            "count": stats.count,
+            "mean": stats.average(),
+            "std_deviation": stats.std_deviation(),
+            "median": percentile(ordered, 50),
+            "p95": percentile(ordered, 95)}
+
+    def rank(self, n: int = 10, min_count: int = 1,
+             slowest: bool = True) -> list[dict[str, Any]]:
+        """
+        Summaries of the n slowest (or fastest) pairs by mean delay,
+        ignoring pairs seen fewer than `min_count` times.
+        """
+        means = [(sum(pair_delays) / len(pair_delays), pair)
+                 for pair, pair_delays in self.delays.items()
+                 if len(pair_delays) >= min_count]
+        means.sort(reverse=slowest)
+        return [self.summarize(pair) for _, pair in means[:n]]
+
+    def slowest(self, n: int = 10, min_count: int = 1) -> list[dict[str, Any]]:
+        return self.rank(n, min_count, slowest=True)
+
+    def fastest(self, n: int = 10, min_count: int = 1) -> list[dict[str, Any]]:
+        return self.rank(n, min_count, slowest=False)
+
+
+class Segment:
+    """
+    A run of keystrokes with no pause longer than the threshold.
+    Keystrokes are referenced by position, never copied.
+
+    Attributes
+    ----------
+    - log_index (`int`): The position of the keystroke list the segment belongs to.
+    - start (`int`): The position of the first keystroke.
+    - end (`int`): The position after the last keystroke.
+    - pause (`float` | `None`): The gap before the segment. None for the first segment of a list.
+    - stats (`DelayStats`): The delays within the segment, excluding the gap before it.
+    """
+    __slots__ = ('log_index', 'start', 'end', 'pause', 'stats')
+
+    def __init__(self, log_index: int, start: int,
+                 pause: float | None = None) -> None:
+        self.log_index = log_index
+        self.start = start
+        self.end = start
+        self.pause = pause
+        self.stats = DelayStats()
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    @property
+    def duration(self) -> float:
+        return self.stats.total
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "log_index": self.log_index,
+            "start": self.start,
+            "end": self.end,
+            "pause": self.pause,
+            **self.stats.format_stats(len(self))}
+
+    def __repr__(self) -> str:
+        return f"Segment(log={self.log_index}, {self.start}:{self.end}, wpm={self.stats.wpm()})"
+
+
+def iter_segments(keystroke_lists: KeystrokeList | Iterable[KeystrokeList],
+                  pause: float = BURST_PAUSE) -> Iterator[Segment]:
+    """
+    Split keystrokes into segments at every delay longer than `pause`, in one pass.
+
+    Segments are yielded as soon as they end, so huge logs can be processed
+    segment by segment. Segments never span two keystroke lists.
+    Use BURST_PAUSE for typing bursts and SESSION_PAUSE for sessions.
+
+    Args:
+        `keystroke_lists` (`KeystrokeList` or iterable of them): A log, or every log in a store.
+        `pause` (`float`): The longest delay, in seconds, that does not end a segment.
+    """
+    if pause <= 0:
+        raise ValueError("Pause must be positive.")
+    if isinstance(keystroke_lists, KeystrokeList):
+        keystroke_lists = [keystroke_lists]
+    for log_index, keystrokes in enumerate(keystroke_lists):
+        segment = None
+        for position, keystroke in enumerate(keystrokes):
+            time = keystroke.time
+            if segment is None:
+                segment = Segment(log_index, position)
+            elif time is not None and time > pause:
+                segment.end = position
+                yield segment
+                segment = Segment(log_index, position, time)
+            elif time is not None:
+                segment.stats.add(time)
+        if segment is not None:
+            segment.end = len(keystrokes)
+            yield segment
+
+
+def active_stats(segments: Iterable[Segment]) -> DelayStats:
+    """
+    Merge segment statistics, i.e. the delays of active typing without the pauses.
+    """
+    stats = DelayStats()
+    for segment in segments:
+        stats.merge(segment.stats)
+    return stats
+
+
+class RollingSeries(TypedDict):
+    """
+    Metrics over a sliding window, one point per window end.
+    Values are None where a window has no usable delay.
+    """
+    index: list[int]
+    elapsed: list[float]
+    wpm: list[float | None]
+    mean_delay: list[float | None]
+    outlier_rate: list[float | None]
+
+
+def rolling_series(keystrokes: KeystrokeList,
+                   window: float = 20,
+                   unit: str = WINDOW_KEYSTROKES,
+                   exclude_outliers: bool = True,
+                   use_numpy: bool | None = None) -> RollingSeries:
+    """
+    Rolling WPM, mean delay and outlier rate over a keystroke list, in O(n).
+
+    Every window is a difference of running sums, so no window is summed twice.
+    A keystroke window holds the last `window` keystrokes. A seconds window holds
+    the keystrokes whose whole delay falls in the last `window` seconds.
+    Only full windows are emitted.
+    WPM is unrounded, unlike KeyParser.wpm.
+
+    Args:
+        `keystrokes` (`KeystrokeList`): A session of keystrokes.
+        `window` (`float`): The window size, in keystrokes or seconds.
+        `unit` (`str`): WINDOW_KEYSTROKES or WINDOW_SECONDS.
+        `exclude_outliers` (`bool`): Whether delays above OUTLIER_CUTOFF count toward WPM and mean delay.
+        `use_numpy` (`bool`, optional): Defaults to using NumPy when it is installed.
+
+    Returns:
+        `RollingSeries`: Parallel lists with a point per window.
+    """
+    if unit not in (WINDOW_KEYSTROKES, WINDOW_SECONDS):
+        raise ValueError(f"Unit must be {WINDOW_KEYSTROKES!r} or {WINDOW_SECONDS!r}.")
+    if window <= 0:
+        raise ValueError("Window must be positive.")
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise ImportError("NumPy is required for use_numpy=True.")
+    elapsed = keystrokes.cumulative_times()
+    if use_numpy:
+        return _rolling_series_numpy(keystrokes, elapsed, window, unit, exclude_outliers)
+
+    # Running counts and sums over the first k keystrokes
+    timed = [0]
+    outliers = [0]
+    counted = [0]
+    counted_time = [0.0]
+    for keystroke in keystrokes:
+        time = keystroke.time
+        is_timed = time is not None
+        is_outlier = is_timed and time > OUTLIER_CUTOFF  # type: ignore
+        is_counted = is_timed and not (exclude_outliers and is_outlier)
+        timed.append(timed[-1] + is_timed)
+        outliers.append(outliers[-1] + is_outlier)
+        counted.append(counted[-1] + is_counted)
+        counted_time.append(counted_time[-1] + (time if is_counted else 0.0))  # type: ignore
+
+    series: RollingSeries = {'index': [], 'elapsed': [], 'wpm': [],
+                             'mean_delay': [], 'outlier_rate': []}
+    start = 0
+    for end in range(len(elapsed)):
+        if unit == WINDOW_KEYSTROKES:
+            if end + 1 < window:
+                continue
+            start = end + 1 - int(window)
+        else:
+            if elapsed[end] < window:
+                continue
+            # The first keystroke whose previous keystroke is inside the window
+            start = bisect_left(elapsed, elapsed[end] - window,
+                                max(start - 1, 0), end + 1) + 1
+        count = counted[end + 1] - counted[start]
+        seconds = counted_time[end + 1] - counted_time[start]
+        timed_count = timed[end + 1] - timed[start]
+        series['index'].append(end)
+        series['elapsed'].append(elapsed[end])
+        series['wpm'].append(count / seconds * 12 if seconds > 0 else None)
+        series['mean_delay'].append(seconds / count if count else None)
+        series['outlier_rate'].append(
+            (outliers[end + 1] - outliers[start]) / timed_count if timed_count else None)
+    return series
+
+
+def _rolling_series_numpy(keystrokes: KeystrokeList, elapsed: list[float],
+                          window: float, unit: str,
+                          exclude_outliers: bool) -> RollingSeries:
+    times = np.array([np.nan if keystroke.time is None else keystroke.time
+                      for keystroke in keystrokes], dtype=np.float64)
+    is_timed = ~np.isnan(times)
+    is_outlier = times > OUTLIER_CUTOFF
+    is_counted = is_timed & ~is_outlier if exclude_outliers else is_timed
+
+    def running(values: 'np.ndarray') -> 'np.ndarray':
+        return np.concatenate(([0], np.cumsum(values)))
+
+    timed = running(is_timed.astype(np.int64))
+    outliers = running(is_outlier.astype(np.int64))
+    counted = running(is_counted.astype(np.int64))
+    counted_time = running(np.where(is_counted, times, 0.0))
+    elapsed_array = np.array(elapsed, dtype=np.float64)
+    ends = np.arange(len(times))
+    if unit == WINDOW_KEYSTROKES:
+        ends = ends[ends + 1 >= window]
+        starts = ends + 1 - int(window)
+    else:
+        ends = ends[elapsed_array >= window]
+        starts = np.searchsorted(
+            elapsed_array, elapsed_array[ends] - window, side='left') + 1
+    count = counted[ends + 1] - counted[starts]
+    seconds = counted_time[ends + 1] - counted_time[starts]
+    timed_count = timed[ends + 1] - timed[starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wpm = np.where(seconds > 0, count / seconds * 12, np.nan)
+        mean_delay = np.where(count > 0, seconds / count, np.nan)
+        outlier_rate = np.where(
+            timed_count > 0, (outliers[ends + 1] - outliers[starts]) / timed_count, np.nan)
+
+    def to_list(values: 'np.ndarray') -> list[float | None]:
+        return [None if value != value else value for value in values.tolist()]
+
+    return {'index': ends.tolist(),
+            'elapsed': elapsed_array[ends].tolist(),
+            'wpm': to_list(wpm),
+            'mean_delay': to_list(mean_delay),
+            'outlier_rate': to_list(outlier_rate)}
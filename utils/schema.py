@@ -0,0 +1,215 @@
+# This file is for versioning the logfile format and migrating old logfiles.
+
+# Standard library imports
+from json import JSONDecoder, JSONDecodeError
+from os import path, replace, remove
+from typing import Any, Callable, Iterable, Iterator, TextIO
+
+# KeyMaster imports
+from utils.helpers import get_filepath
+from utils.validation import dump_logs
+
+# Version 1 is the implicit format: a bare list of logs with no header.
+# Version 2 adds the header and drops legacy shift keystrokes.
+LEGACY_SCHEMA_VERSION = 1
+SCHEMA_VERSION = 2
+SCHEMA_KEY = "schema_version"
+
+READ_CHUNK_SIZE = 1 << 16  # characters per read when streaming a logfile
+
+RawLog = dict[str, Any]
+Migration = Callable[[RawLog], RawLog]
+
+# Maps a version to the migration that upgrades a raw log to the next version
+MIGRATIONS: dict[int, Migration] = {}
+
+
+def register_migration(from_version: int) -> Callable[[Migration], Migration]:
+    """
+    Register a function that upgrades a raw (undecoded) log from
+    `from_version` to `from_version + 1`.
+    """
+    def decorator(migration: Migration) -> Migration:
+        if from_version in MIGRATIONS:
+            raise ValueError(
+                f"A migration from version {from_version} already exists.")
+        MIGRATIONS[from_version] = migration
+        return migration
+    return decorator
+
+
+@register_migration(1)
+def drop_shift_keystrokes(raw_log: RawLog) -> RawLog:
+    """
+    Remove legacy shift keystrokes, which do not change the typed string.
+    Equivalent to KeystrokeList.prune_shifts on the raw [key, time] pairs.
+    """
+    keystrokes = [pair for pair in raw_log['keystrokes']
+                  if pair[0] != "Key.shift"]
+    if keystrokes:
+        keystrokes[0] = [keystrokes[0][0], None]
+    raw_log['keystrokes'] = keystrokes
+    return raw_log
+
+
+def make_schema_header(version: int = SCHEMA_VERSION) -> dict[str, int]:
+    return {SCHEMA_KEY: version}
+
+
+def is_schema_header(obj: Any) -> bool:
+    """
+    Check if a logfile entry is the schema header rather than a log.
+    """
+    return isinstance(obj, dict) and SCHEMA_KEY in obj and 'id' not in obj
+
+
+def split_schema_header(entries: list[Any]) -> tuple[int, list[Any]]:
+    """
+    Split a loaded logfile into its schema version and its logs.
+    """
+    if entries and is_schema_header(entries[0]):
+        return entries[0][SCHEMA_KEY], entries[1:]
+    return LEGACY_SCHEMA_VERSION, entries
+
+
+def migrate_raw_log(raw_log: RawLog, from_version: int,
+                    to_version: int = SCHEMA_VERSION) -> RawLog:
+    """
+    Apply every registered migration between two versions to a raw log.
+    """
+    for version in range(from_version, to_version):
+        if version not in MIGRATIONS:
+            raise ValueError(f"No migration from version {version}.")
+        raw_log = MIGRATIONS[version](raw_log)
+    return raw_log
+
+
+def iter_raw_entries(fp: TextIO,
+                     chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield each entry of a JSON list one at a time, reading the file in chunks.
+    Memory is bounded by about twice the largest entry plus one chunk.
+
+    An entry that does not fit in the buffer is retried after reading as much
+    again as is buffered, so a large entry is decoded O(log size) times, not once per chunk.
+    """
+    decoder = JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill(size: int = chunk_size) -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = fp.read(size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def next_char() -> str:
+        # Skip whitespace and return the next significant character
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                raise ValueError("Unexpected end of logfile.")
+
+    if next_char() != '[':
+        raise ValueError("Logfile must contain a list of logs.")
+    pos += 1
+    if next_char() == ']':
+        return
+    while True:
+        next_char()
+        while True:
+            try:
+                entry, end = decoder.raw_decode(buffer, pos)
+            except JSONDecodeError:
+                # Grow geometrically so a large entry is not decoded once per chunk
+                if not fill(max(chunk_size, len(buffer) - pos)):
+                    raise
+                continue
+            # A value ending at the buffer edge (like a number) may be cut off
+            if end == len(buffer) and fill():
+                continue
+            break
+        pos = end
+        yield entry
+        separator = next_char()
+        pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f"Expected ',' or ']' in logfile, got {separator!r}.")
+
+
+def read_schema_version(filename: str) -> int:
+    """
+    Read the schema version of a logfile without loading all of it.
+    """
+    filepath = get_filepath(filename)
+    if filepath is None:
+        raise ValueError("No filepath found.")
+    with open(filepath, 'r') as f:
+        for entry in iter_raw_entries(f):
+            if is_schema_header(entry):
+                return entry[SCHEMA_KEY]
+            break
+    return LEGACY_SCHEMA_VERSION
+
+
+def migrate_logfile(filename: str,
+                    output: str | None = None,
+                    to_version: int = SCHEMA_VERSION) -> int:
+    """
+    Upgrade a logfile to a schema version, one log at a time.
+
+    Logs are streamed from the source and written to a temporary file, which
+    then replaces the output, so files of any size migrate with bounded memory.
+
+    Args:
+        `filename` (`str`): The logfile. Use 'REG' or 'SIM' for main logfiles.
+        `output` (`str`, optional): Where to write the result. Defaults to the source.
+        `to_version` (`int`): The version to upgrade to.
+
+    Returns:
+        `int`: The number of logs migrated.
+    """
+    filepath = get_filepath(filename)
+    if filepath is None:
+        raise ValueError("No filepath found.")
+    output_path = filepath if output is None else output
+    temp_path = output_path + '.migrating'
+    migrated_count = 0
+
+    def migrated_entries(entries: Iterable[Any]) -> Iterator[Any]:
+        nonlocal migrated_count
+        yield make_schema_header(to_version)
+        from_version = None
+        for entry in entries:
+            if from_version is None:
+                if is_schema_header(entry):
+                    from_version = entry[SCHEMA_KEY]
+                    if from_version > to_version:
+                        raise ValueError(
+                            f"Cannot downgrade from version {from_version}.")
+                    continue
+                from_version = LEGACY_SCHEMA_VERSION
+            yield migrate_raw_log(entry, from_version, to_version)
+            migrated_count += 1
+
+    try:
+        with open(filepath, 'r') as source, open(temp_path, 'w') as target:
+            dump_logs(migrated_entries(iter_raw_entries(source)), target)
+        replace(temp_path, output_path)
+    finally:
+        if path.exists(temp_path):
+            remove(temp_path)
+    return migrated_count
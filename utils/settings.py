@@ -53,6 +53,16 @@ COLLECT_ONLY_TYPEABLE = False
 
 ### KeyAnalyzer (classes/key_analyzer.py)###
 OUTLIER_CUTOFF = 3.0  # seconds
+CACHE_METRICS = True  # Keep per-log summaries next to the logfile
+METRIC_CACHE_SUFFIX = ".metrics"
+NGRAM_INDEX_SUFFIX = ".ngrams"  # Trigram string index next to the logfile
+FEATURE_CACHE_SUFFIX = ".features.npz"  # Feature matrix next to the logfile
+SIMILARITY_IVF_THRESHOLD = 1_000_000  # logs. Larger stores get an approximate similarity index
+SIMILARITY_PROBES = 16  # Clusters searched per approximate similarity query
+QUANTILE_SKETCH_K = 200  # Sketch accuracy. Memory grows linearly with it
+MEMO_SIZE = 128  # Derived results memoized per KeyParser
+BURST_PAUSE = 2.0  # seconds. A longer delay ends a typing burst
+SESSION_PAUSE = 60.0  # seconds. A longer delay ends a typing session
 
 # Misc
 STOP_KEY = "*"  # Special char that stops the listener and halts keystrokes generation
@@ -60,6 +70,10 @@ STOP_CODE = 'STOP'
 # keystroke.time value of formulaically generated shift keystrokes
 SHIFT_SPEED = round(2 / 9, ROUND_DIGITS)
 
+# Diagnostics (utils/diagnostics.py)
+DIAGNOSTIC_SAMPLE_LIMIT = 10  # samples kept per category
+LOG_DIAGNOSTICS_AT_EXIT = False
+
 # UNOFFICIAL
 # max length of Keystroke.key (to prevent invalid overflow)
 MAX_KEY_LENGTH = 20
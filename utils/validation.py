@@ -1,8 +1,13 @@
 # This file is for validating keys across various types.
 
 # Standard library imports
+from bisect import bisect_right
+from hashlib import blake2b
+from itertools import accumulate
 from json import JSONDecoder, JSONEncoder
-from typing import Iterator, TypedDict, Any, Union
+from json.encoder import encode_basestring, encode_basestring_ascii
+from math import isfinite
+from typing import Iterable, Iterator, TextIO, TypedDict, Any, Union
 
 # Third party imports
 from pynput.keyboard import Key
@@ -11,6 +16,13 @@ from pynput.keyboard import Key
 from utils.settings import MAX_KEY_LENGTH, SPECIAL_KEYS, STOP_KEY, STOP_CODE, ROUND_DIGITS
 from utils.constants import EMPTY_WRAPPED_CHAR, APOSTROPHE, KEYBOARD_CHARS
 from utils.helpers import is_valid_wrapped_char, is_valid_wrapped_special_key, unwrap_char, is_key_valid
+from utils.diagnostics import (
+    DIAGNOSTICS,
+    INVALID_KEYSTROKE,
+    VALIDATION_MISMATCH,
+    CAPS_LOCK_SWAP,
+    NULL_TIME_REMOVED,
+    NULL_TIME_REPLACED)
 
 
 class LegalKey:
@@ -127,6 +139,57 @@ class Keystroke:
             return self.key == other
         return False
 
+    def swapcase(self) -> 'Keystroke':
+        """
+        Returns a keystroke with the case of its typeable character switched.
+        Switching case keeps an ASCII char typeable, so validation is skipped.
+        """
+        if not self.is_typeable_char or self.unicode_char is None:
+            raise ValueError('Only typeable characters can switch case')
+        swapped_char = self.unicode_char.swapcase()
+        if swapped_char == self.unicode_char:
+            return self
+        swapped = Keystroke.__new__(Keystroke)
+        swapped.key = self.key.swapcase()
+        swapped.time = self.time
+        swapped.valid = True
+        swapped.unicode_char = swapped_char
+        swapped.is_typeable_char = True
+        swapped.legal_key = LegalKey(swapped_char, False)
+        return swapped
+
+    def apply_to(self, chars: list[str]) -> bool:
+        """
+        Apply the keystroke to a list of decoded characters, as typing it would.
+        Backspace removes the last character and keys like Shift are ignored.
+
+        Returns:
+            bool: False if the keystroke is invalid and was skipped.
+        """
+        if not self.valid:
+            return False
+        char = self.unicode_char
+        if char is not None:
+            chars.append(char)
+            return True
+        # This means it is a special key
+        key = self.key
+        if key == STOP_CODE:
+            chars.append(STOP_KEY)
+        elif key in SPECIAL_KEYS:
+            decoded_key = SPECIAL_KEYS[key]
+            if decoded_key == Key.backspace:
+                if chars:
+                    # Remove the last character
+                    chars.pop()
+            elif decoded_key == Key.space:
+                chars.append(' ')
+            elif decoded_key == Key.enter:
+                chars.append('\n')
+            elif decoded_key == Key.tab:
+                chars.append('\t')
+        return True
+
     def legalize(self) -> LegalKey:
         """
         Returns a LegalKey object or raises a ValueError.
@@ -164,8 +227,32 @@ class KeystrokeList:
         #     raise TypeError('keystrokes must be a list of Keystroke objects')
         self.keystrokes = keystrokes
         self.length = len(keystrokes)
+        # Cached values derived from the keystrokes, built on demand
+        self._cumulative_times: list[float] | None = None
+        self._digest: bytes | None = None
         self.set_null_time()
 
+    def invalidate(self) -> None:
+        """
+        Clear cached values derived from the keystrokes.
+        Call this after changing a Keystroke's key or time directly.
+        """
+        self._cumulative_times = None
+        self._digest = None
+
+    def digest(self) -> bytes:
+        """
+        Returns a content digest of the keys and delays, cached until the list changes.
+        Delays are encoded exactly, so equal digests mean equal keystrokes.
+        """
+        if self._digest is None:
+            digest = blake2b(digest_size=16)
+            digest.update('\x1e'.join(
+                f"{keystroke.key}\x1f{keystroke.time!r}" for keystroke in self.keystrokes
+            ).encode('utf-8', 'surrogatepass'))
+            self._digest = digest.digest()
+        return self._digest
+
     def set_null_time(self) -> None:
         """
         Set the time of the first keystroke to None.
@@ -173,6 +260,7 @@ class KeystrokeList:
         if self.is_empty():
             return
         self.keystrokes[0].time = None
+        self.invalidate()
 
     def append(self, keystroke: Keystroke) -> None:
         if not isinstance(keystroke, Keystroke):
@@ -181,6 +269,7 @@ class KeystrokeList:
             keystroke.time = None
         self.keystrokes.append(keystroke)
         self.length += 1
+        self.invalidate()
 
     def extend(self, keystrokes, prune=False) -> None:
         """
@@ -196,6 +285,7 @@ class KeystrokeList:
 
         self.keystrokes.extend(keystrokes.keystrokes)
         self.length = len(self.keystrokes)
+        self.invalidate()
         # Ensure first Keystone.time set to None
         self.set_null_time()
         # prune other null values
@@ -219,9 +309,15 @@ class KeystrokeList:
 
     def __eq__(self, other) -> bool:
         if isinstance(other, KeystrokeList):
-            return self.keystrokes == other.keystrokes
+            if len(self.keystrokes) != len(other.keystrokes):
+                return False
+            return self.digest() == other.digest()
         return False
 
+    def __hash__(self) -> int:
+        # The hash follows the content, so don't mutate a list used as a dict key
+        return hash(self.digest())
+
     def __setitem__(self, index, value):
         """
         Set the value at the given index.
@@ -241,6 +337,59 @@ class KeystrokeList:
         if index >= len(self.keystrokes):
             raise IndexError('Index out of range')
         self.keystrokes[index] = value
+        self.invalidate()
+
+    def cumulative_times(self) -> list[float]:
+        """
+        Returns the elapsed time at each keystroke, measured from the first one.
+        This is the prefix sum of the delays (None counts as 0), cached until the list changes.
+        """
+        if self._cumulative_times is None:
+            self._cumulative_times = list(accumulate(
+                (keystroke.time or 0.0 for keystroke in self.keystrokes[1:]),
+                initial=0.0)) if self.keystrokes else []
+        return self._cumulative_times
+
+    def elapsed(self, start: int = 0, end: int | None = None) -> float:
+        """
+        Returns the seconds between the keystrokes at two indices in O(1).
+
+        Args:
+            start (int): The index of the first keystroke.
+            end (int, optional): The index of the last keystroke. Defaults to the last one.
+        """
+        cumulative_times = self.cumulative_times()
+        if end is None:
+            end = len(cumulative_times) - 1
+        if not 0 <= start <= end < len(cumulative_times):
+            raise IndexError('Index out of range')
+        return cumulative_times[end] - cumulative_times[start]
+
+    def wpm_between(self, start: int = 0,
+                    end: int | None = None) -> float | None:
+        """
+        Returns the words per minute typed between two indices in O(1).
+        Every keystroke after `start` up to `end` counts as a character. Outliers are kept.
+
+        Returns:
+            float or None: None if no time elapsed.
+        """
+        if end is None:
+            end = self.length - 1
+        seconds = self.elapsed(start, end)
+        if seconds <= 0:
+            return None
+        cpm = ((end - start) / seconds) * 60
+        return round(cpm / 5, 1)
+
+    def index_at(self, seconds: float) -> int:
+        """
+        Returns the index of the last keystroke typed at or before an elapsed time.
+        Uses a binary search over the cumulative times.
+        """
+        if self.is_empty():
+            raise IndexError('No keystrokes')
+        return max(bisect_right(self.cumulative_times(), seconds) - 1, 0)
 
     def to_string(self) -> str:
         """
@@ -248,39 +397,11 @@ class KeystrokeList:
         """
         if self.is_empty():
             return ""
-        output_string = ""
-        word_count = 0
-        keystrokes = self.keystrokes
-        for keystroke in keystrokes:
-            if not keystroke.valid:
-                print(f"Invalid keystroke: {keystroke.key}")
-                continue
-            char = keystroke.unicode_char
-            if char is not None:
-                output_string += char
-            else:
-                # This means it is a special key
-                key = keystroke.key
-                # Handle special keys
-                if key == STOP_CODE:
-                    decoded_stop_key = STOP_KEY
-                    output_string += decoded_stop_key
-                elif key in SPECIAL_KEYS:
-                    decoded_key = SPECIAL_KEYS[key]
-                    if decoded_key == Key.backspace:
-                        if output_string != '':
-                            # Remove the last character
-                            output_string = output_string[:-1]
-                    elif decoded_key == Key.space:
-                        output_string += ' '
-                        word_count += 1
-                    elif decoded_key == Key.enter:
-                        output_string += '\n'
-                    elif decoded_key == Key.tab:
-                        output_string += '\t'
-                    else:
-                        continue  # Ignore keys like Shift
-        return output_string
+        chars: list[str] = []
+        for keystroke in self.keystrokes:
+            if not keystroke.apply_to(chars):
+                DIAGNOSTICS.record(INVALID_KEYSTROKE, keystroke.key)
+        return ''.join(chars)
 
     def process_caps_lock(self) -> None:
         """
@@ -290,20 +411,16 @@ class KeystrokeList:
         """
         if self.is_empty():
             return
-        caps_lock = False
-        swap_count = 0
-        for i in range(len(self.keystrokes)):
-            keystroke = self.keystrokes[i]
-            if keystroke.key == "Key.caps_lock":
-                caps_lock = not caps_lock
-            elif caps_lock:
-                if keystroke.is_typeable_char:
-                    swap_count += 1
-                    # switch the case of the key
-                    old_key = keystroke.key
-                    new_key = old_key.swapcase()
-                    self.keystrokes[i] = Keystroke(new_key, keystroke.time)
-        print(f"Switched case of {swap_count} characters.")
+        KeystrokePipeline([CapsLockTransform()]).apply(self)
+
+    def transform(self, *transforms: 'KeystrokeTransform') -> None:
+        """
+        Apply a chain of cleanup passes in a single traversal.
+
+        Args:
+            transforms (KeystrokeTransform): The passes, applied in order to each keystroke.
+        """
+        KeystrokePipeline(list(transforms)).apply(self)
 
     def validate(self, input_string: str) -> bool:
         """
@@ -320,32 +437,21 @@ class KeystrokeList:
         validation_string = self.to_string()
         if input_string == validation_string:
             return True
-        if len(input_string) != len(validation_string):
-            print(f"Warning: validate_keystrokes: Lengths not equal.")
-        # Find the first character that differs
-        max_length = max(len(input_string), len(validation_string))
-        for i in range(max_length):
-            # safety check
-            if i >= len(input_string):
-                print(
-                    f"Validation string found extra char at index {i}:{(validation_string[i])}<-")
-                break
-
-            elif i >= len(validation_string):
-                print(
-                    f"Input string found extra char at index {i}: {(input_string[i])} <-")
-                break
-            typed_char = input_string[i]
-            validation_char = validation_string[i]
+        # Record the first index where the strings differ
+        # A character is None when one string is longer than the other
+        index = 0
+        for typed_char, validation_char in zip(input_string, validation_string):
             if typed_char != validation_char:
-                print(f"String does not align with keystroke list!")
-                print(f"Input:{typed_char}<-")
-                print(f"Validation string:{validation_char}<-")
                 break
+            index += 1
+        typed_char = input_string[index] if index < len(input_string) else None
+        validation_char = validation_string[index] if index < len(
+            validation_string) else None
+        DIAGNOSTICS.record(VALIDATION_MISMATCH,
+                           (index, typed_char, validation_char))
         return False
 
     def prune_bad_nuns(self, destructive=False) -> int:
-        assert ROUND_DIGITS > 0
         """
         Remove all extraneous null (None) times from the list of keystrokes.
 
@@ -353,35 +459,163 @@ class KeystrokeList:
             destructive (bool): If False, null times are replaced with 0.001 second delays.
 
         Returns:
-            int: The number of null times removed.
+            int: The number of null times found.
         """
-        pruned_keystrokes = []
-        none_count = 0
-        for keystroke in self.keystrokes:
-            if keystroke.time is None:
-                none_count += 1
-                if none_count > 1:
-                    if destructive:
-                        print("Removing keystroke with None time")
-                        continue
-                    else:
-                        print("Replacing keystroke with shortest delay")
-                        shortest_delay = float(1 / (10 ** (ROUND_DIGITS - 1)))
-                        keystroke.time = shortest_delay
-            pruned_keystrokes.append(keystroke)
-        self.keystrokes = pruned_keystrokes
-        return none_count
+        prune_nulls = PruneNullTimesTransform(destructive)
+        KeystrokePipeline([prune_nulls]).apply(self)
+        return prune_nulls.none_count
 
     def prune_shifts(self) -> None:
         """
         Remove all extraneous shift keys from the list of keystrokes.
         """
-        pruned_keystrokes = []
-        for keystroke in self.keystrokes:
-            if keystroke.legal_key == "'shift'":
-                continue
-            pruned_keystrokes.append(keystroke)
-        self.keystrokes = pruned_keystrokes
+        KeystrokePipeline([PruneShiftsTransform()]).apply(self)
+
+
+class KeystrokeTransform:
+    """
+    A cleanup pass over a KeystrokeList, applied one keystroke at a time.
+
+    Subclasses override `transform`, returning the (possibly replaced) keystroke,
+    or None to drop it. Transforms chained in a KeystrokePipeline share one traversal.
+    """
+
+    def start(self) -> None:
+        """
+        Reset any state before a traversal.
+        """
+        return
+
+    def transform(self, keystroke: Keystroke) -> Keystroke | None:
+        return keystroke
+
+    def finish(self) -> None:
+        """
+        Called once the traversal is done.
+        """
+        return
+
+
+class CapsLockTransform(KeystrokeTransform):
+    """
+    Switch the case of typeable characters typed while caps lock is on.
+    """
+
+    def start(self) -> None:
+        self.caps_lock = False
+        self.swap_count = 0
+
+    def transform(self, keystroke: Keystroke) -> Keystroke | None:
+        if keystroke.key == "Key.caps_lock":
+            self.caps_lock = not self.caps_lock
+        elif self.caps_lock and keystroke.is_typeable_char:
+            self.swap_count += 1
+            return keystroke.swapcase()
+        return keystroke
+
+    def finish(self) -> None:
+        DIAGNOSTICS.add(CAPS_LOCK_SWAP, self.swap_count)
+
+
+class PruneShiftsTransform(KeystrokeTransform):
+    """
+    Drop shift keystrokes.
+    """
+
+    def transform(self, keystroke: Keystroke) -> Keystroke | None:
+        if keystroke.legal_key == "'shift'":
+            return None
+        return keystroke
+
+
+class PruneNullTimesTransform(KeystrokeTransform):
+    """
+    Drop or replace every null (None) time after the first one.
+    """
+
+    def __init__(self, destructive: bool = False) -> None:
+        assert ROUND_DIGITS > 0
+        self.destructive = destructive
+        self.shortest_delay = float(1 / (10 ** (ROUND_DIGITS - 1)))
+        self.none_count = 0
+
+    def start(self) -> None:
+        self.none_count = 0
+
+    def transform(self, keystroke: Keystroke) -> Keystroke | None:
+        if keystroke.time is None:
+            self.none_count += 1
+            if self.none_count > 1:
+                if self.destructive:
+                    DIAGNOSTICS.record(NULL_TIME_REMOVED, keystroke.key)
+                    return None
+                DIAGNOSTICS.record(NULL_TIME_REPLACED, keystroke.key)
+                keystroke.time = self.shortest_delay
+        return keystroke
+
+
+class BannedKeysTransform(KeystrokeTransform):
+    """
+    Drop keystrokes for banned characters.
+    """
+
+    def __init__(self, banned_keys: list[str]) -> None:
+        self.banned_keys = set(banned_keys)
+
+    def transform(self, keystroke: Keystroke) -> Keystroke | None:
+        if keystroke.unicode_char in self.banned_keys:
+            return None
+        return keystroke
+
+
+class KeystrokePipeline:
+    """
+    A composable chain of KeystrokeTransform passes.
+
+    Every transform sees each keystroke in order, so the whole chain runs in a
+    single traversal and rewrites the list in place without intermediate lists.
+    >>> pipeline = KeystrokePipeline([CapsLockTransform()]).then(PruneShiftsTransform())
+    """
+
+    def __init__(self, transforms: list[KeystrokeTransform] | None = None):
+        if transforms is None:
+            transforms = []
+        if not all(isinstance(transform, KeystrokeTransform)
+                   for transform in transforms):
+            raise TypeError('transforms must be KeystrokeTransform objects')
+        self.transforms = transforms
+
+    def then(self, transform: KeystrokeTransform) -> 'KeystrokePipeline':
+        """
+        Return a new pipeline with the transform appended.
+        """
+        return KeystrokePipeline(self.transforms + [transform])
+
+    def apply(self, keystroke_list: KeystrokeList) -> KeystrokeList:
+        """
+        Run every transform over the keystrokes in one pass, in place.
+        """
+        transforms = self.transforms
+        for transform in transforms:
+            transform.start()
+        keystrokes = keystroke_list.keystrokes
+        write_index = 0
+        for keystroke in keystrokes:
+            current: Keystroke | None = keystroke
+            for transform in transforms:
+                current = transform.transform(current)
+                if current is None:
+                    break
+            if current is not None:
+                # write_index never passes the read position
+                keystrokes[write_index] = current
+                write_index += 1
+        del keystrokes[write_index:]
+        keystroke_list.length = write_index
+        keystroke_list.invalidate()
+        for transform in transforms:
+            transform.finish()
+        return keystroke_list
 
 
 class Log(TypedDict):
@@ -398,6 +632,21 @@ class Log(TypedDict):
     # } ]
 
 
+def log_digest(log: Log) -> str:
+    """
+    Returns a content digest of a log's id, string and keystrokes.
+    Logs with equal digests have equal content, so the digest can stand in
+    for a log in sets and dict keys (dedup, grouping and caching).
+    """
+    digest = blake2b(digest_size=16)
+    digest.update(log['id'].encode('utf-8', 'surrogatepass'))
+    digest.update(b'\x1d')
+    digest.update(log['string'].encode('utf-8', 'surrogatepass'))
+    digest.update(b'\x1d')
+    digest.update(log['keystrokes'].digest())
+    return digest.hexdigest()
+
+
 class KeystrokeDecoder(JSONDecoder):
     def __init__(self, *args, **kwargs):
         super().__init__(object_hook=self.object_hook, *args, **kwargs)
@@ -449,3 +698,93 @@ class KeystrokeEncoder(JSONEncoder):
             return [self.default(log) for log in obj]
         raise TypeError(
             f"Object of type {type(obj)} is not JSON serializable.")
+
+    def iterencode_logs(self, logs: Iterable[Log]) -> Iterator[str]:
+        """
+        Encode a list of logs piece by piece without calling default().
+
+        Keystroke pairs are streamed straight from each KeystrokeList, so no
+        intermediate list of lists is built. The output is identical to
+        json_dump(logs, f, cls=KeystrokeEncoder).
+        """
+        if self.indent is not None or self.sort_keys:
+            # Pretty-printed output is rare, let the stock encoder handle it
+            yield from self.iterencode(logs)
+            return
+        item_separator = self.item_separator
+        key_separator = self.key_separator
+        encode_string = encode_basestring_ascii if self.ensure_ascii else encode_basestring
+        yield '['
+        first_log = True
+        for log in logs:
+            if first_log:
+                first_log = False
+            else:
+                yield item_separator
+            if not isinstance(log, dict) or not log or not all(
+                    isinstance(field, str) for field in log):
+                yield from self.iterencode(log)
+                continue
+            yield '{'
+            first_field = True
+            for field, value in log.items():
+                if first_field:
+                    first_field = False
+                else:
+                    yield item_separator
+                yield encode_string(field)
+                yield key_separator
+                if isinstance(value, KeystrokeList):
+                    yield from self.iterencode_keystrokes(value)
+                elif isinstance(value, str):
+                    yield encode_string(value)
+                else:
+                    yield from self.iterencode(value)
+            yield '}'
+        yield ']'
+
+    def iterencode_keystrokes(
+            self, keystrokes: KeystrokeList) -> Iterator[str]:
+        """
+        Encode a KeystrokeList one [key, time] pair at a time.
+        """
+        if keystrokes.is_empty():
+            yield '[]'
+            return
+        item_separator = self.item_separator
+        encode_string = encode_basestring_ascii if self.ensure_ascii else encode_basestring
+        prefix = '[['
+        for keystroke in keystrokes.keystrokes:
+            time = keystroke.time
+            if time is None:
+                encoded_time = 'null'
+            elif isinstance(time, float) and isfinite(time):
+                encoded_time = float.__repr__(time)
+            else:
+                encoded_time = self.encode(time)
+            yield prefix + encode_string(keystroke.key) + item_separator + encoded_time + ']'
+            prefix = item_separator + '['
+        yield ']'
+
+
+def dump_logs(logs: Iterable[Log], fp: TextIO,
+              chunk_size: int = 4096) -> None:
+    """
+    Write logs to an open file with the streaming KeystrokeEncoder.
+
+    Pieces are buffered and written every `chunk_size` pieces, so the extra
+    memory used does not grow with the size of the logfile.
+
+    Args:
+        logs (list[Log]): The logs to write.
+        fp (TextIO): A file opened for writing.
+        chunk_size (int): The number of encoded pieces per write.
+    """
+    buffer: list[str] = []
+    for piece in KeystrokeEncoder().iterencode_logs(logs):
+        buffer.append(piece)
+        if len(buffer) >= chunk_size:
+            fp.write(''.join(buffer))
+            buffer.clear()
+    if buffer:
+        fp.write(''.join(buffer))